@@ -0,0 +1,192 @@
+import sqlite3
+import statistics
+from bisect import bisect_right
+from datetime import datetime
+from sqlalchemy import Float, case, cast, func, select, union_all
+from sqlalchemy.orm import Session
+from app import archive, models
+
+# 📈 Utilisation de la flotte : temps loué / disponible par capteur, type et chantier,
+# distribution des intervalles entre retours. Les sommes par capteur et par chantier et les
+# écarts entre retours sont calculés en base (GROUP BY, lag) : seuls les agrégats remontent.
+EPOCH = datetime(1970, 1, 1)
+DAY = 86400.0
+
+INTERVAL_BOUNDS = (7, 14, 30, 60, 90, 180, 365)                    # jours
+UTILIZATION_BOUNDS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)  # taux
+
+
+def _epoch(dialect, column):
+    # Secondes depuis l'epoch calculées par la base (float : EXTRACT renvoie un numeric sous PostgreSQL 14+)
+    if dialect.name == "sqlite":
+        return (func.julianday(column) - 2440587.5) * 86400.0
+    return cast(func.extract("epoch", column), Float)
+
+
+def _secondes_entre(dialect, fin, debut):
+    # Équivalent SQL de (fin - debut).total_seconds()
+    if dialect.name == "sqlite":
+        return (func.julianday(fin) - func.julianday(debut)) * 86400.0
+    return cast(func.extract("epoch", fin - debut), Float)
+
+
+def _least(dialect, a, b):
+    # min/max à deux arguments : fonctions scalaires sous SQLite (dates ISO comparables), least/greatest ailleurs
+    return func.min(a, b) if dialect.name == "sqlite" else func.least(a, b)
+
+
+def _greatest(dialect, a, b):
+    return func.max(a, b) if dialect.name == "sqlite" else func.greatest(a, b)
+
+
+def _window_functions(dialect):
+    return dialect.name != "sqlite" or sqlite3.sqlite_version_info >= (3, 25)
+
+
+def _percentiles(values):
+    if not values:
+        return {"p50": None, "p90": None, "p99": None}
+    if len(values) == 1:
+        return {"p50": values[0], "p90": values[0], "p99": values[0]}
+    q = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": round(q[49], 3), "p90": round(q[89], 3), "p99": round(q[98], 3)}
+
+
+def _histogram(values, bounds):
+    counts = [0] * (len(bounds) + 1)
+    for v in values:
+        counts[bisect_right(bounds, v)] += 1
+    edges = (None,) + tuple(bounds) + (None,)
+    return [{"min": edges[i], "max": edges[i + 1], "count": n} for i, n in enumerate(counts)]
+
+
+def _rate(rented, span):
+    return round(min(rented / span, 1.0), 4) if span else None
+
+
+def _movement_models(db: Session, start: datetime):
+    movement_models = [models.SensorMovement]
+    if archive.includes_archive(db, start.date()):
+        movement_models.insert(0, models.SensorMovementArchive)
+    return movement_models
+
+
+def _union(selects):
+    return (union_all(*selects) if len(selects) > 1 else selects[0]).subquery()
+
+
+def _movements(movement_models, start: datetime, end: datetime):
+    """Mouvements rattachés à un capteur qui touchent la fenêtre.
+
+    Sans OR sur les dates : la table chaude est bornée par l'archivage, la parcourir dans l'ordre
+    de l'index (sensor_id, date_retour) coûte moins qu'une recherche par plage sur date_retour.
+    """
+    return _union([
+        select(model.sensor_id, model.chantier, model.date_depart, model.date_retour)
+        .where(model.sensor_id.isnot(None))
+        .where(func.coalesce(model.date_retour, end) >= start)   # en cours : jusqu'à la fin
+        .where(func.coalesce(model.date_depart, start) < end)
+        for model in movement_models
+    ])
+
+
+def _return_intervals(db: Session, movement_models, start: datetime, end: datetime, dialect):
+    """Écarts en jours entre deux retours successifs d'un même capteur, dans la fenêtre."""
+    # (sensor_id, date_retour) seulement : lu depuis l'index, déjà dans l'ordre du lag
+    retours = _union([
+        select(model.sensor_id, model.date_retour)
+        .where(model.sensor_id.isnot(None))
+        .where(func.coalesce(model.date_retour, end) >= start, func.coalesce(model.date_retour, end) < end)
+        for model in movement_models
+    ])
+    if _window_functions(dialect):
+        precedent = func.lag(retours.c.date_retour).over(partition_by=retours.c.sensor_id,
+                                                         order_by=retours.c.date_retour)
+        paires = select(retours.c.date_retour, precedent.label("precedent")).subquery()
+        ecarts = select(_secondes_entre(dialect, paires.c.date_retour, paires.c.precedent))\
+            .where(paires.c.precedent.isnot(None))
+        return [e / DAY for e in db.execute(ecarts).scalars()]
+
+    # 🐢 Repli (SQLite sans fonctions de fenêtrage) : une requête triée, écarts calculés en Python
+    rows = db.execute(select(retours).order_by(retours.c.sensor_id, retours.c.date_retour)).all()
+    return [(b.date_retour - a.date_retour).total_seconds() / DAY
+            for a, b in zip(rows, rows[1:]) if a.sensor_id == b.sensor_id]
+
+
+def compute_utilization(db: Session, start: datetime, end: datetime):
+    w0, w1 = (start - EPOCH).total_seconds(), (end - EPOCH).total_seconds()
+    dialect = db.get_bind().dialect
+
+    # 1. Temps loué de chaque mouvement, borné à la fenêtre (en cours → jusqu'à la fin), sommé en base
+    movement_models = _movement_models(db, start)
+    mv = _movements(movement_models, start, end)
+    fin = _least(dialect, func.coalesce(mv.c.date_retour, end), end)
+    debut = _greatest(dialect, mv.c.date_depart, start)
+    loue = case((mv.c.date_depart.is_(None), 0.0),
+                else_=_greatest(dialect, 0.0, _secondes_entre(dialect, fin, debut)))
+    rented_by_sensor = dict(db.execute(select(mv.c.sensor_id, func.sum(loue)).group_by(mv.c.sensor_id)).all())
+    by_chantier = db.execute(
+        select(mv.c.chantier, func.count(), func.sum(loue), func.count(mv.c.sensor_id.distinct()),
+               func.sum(case((mv.c.date_depart.is_(None), 1), else_=0)))
+        .group_by(mv.c.chantier)
+    ).all()
+    intervals = _return_intervals(db, movement_models, start, end, dialect)
+
+    # 2. Capteurs : durée d'existence dans la fenêtre (créé en cours de période → fenêtre réduite)
+    sensors = db.execute(
+        select(models.Sensor.id, models.Sensor.type, _epoch(dialect, models.Sensor.date_creation))
+    ).all()
+    capteurs, by_type = [], {}
+    total_loue = total_span = 0.0
+    for sensor_id, type_, created in sensors:
+        span = max(0.0, w1 - max(w0, created if created is not None else w0))
+        rented = min(rented_by_sensor.get(sensor_id) or 0.0, span)
+        taux = _rate(rented, span)
+        capteurs.append({"sensor_id": sensor_id, "type": type_, "jours_loues": round(rented / DAY, 2),
+                         "jours_disponibles": round((span - rented) / DAY, 2), "taux_utilisation": taux})
+        agg = by_type.setdefault(type_, [0, 0.0, 0.0, []])
+        agg[0] += 1
+        agg[1] += rented
+        agg[2] += span
+        if taux is not None:
+            agg[3].append(taux)
+        total_loue += rented
+        total_span += span
+
+    taux_capteurs = [c["taux_utilisation"] for c in capteurs if c["taux_utilisation"] is not None]
+    return {
+        "start": start,
+        "end": end,
+        "flotte": {
+            "nb_capteurs": len(capteurs),
+            "jours_loues": round(total_loue / DAY, 1),
+            "jours_disponibles": round((total_span - total_loue) / DAY, 1),
+            "taux_utilisation": _rate(total_loue, total_span),
+            "utilisation_capteurs": {
+                **_percentiles(taux_capteurs),
+                "histogramme": _histogram(taux_capteurs, UTILIZATION_BOUNDS),
+            },
+        },
+        "par_type": [
+            {"type": t, "nb_capteurs": n, "jours_loues": round(rented / DAY, 1),
+             "jours_disponibles": round((span - rented) / DAY, 1), "taux_utilisation": _rate(rented, span),
+             "p50_utilisation": _percentiles(taux)["p50"]}
+            for t, (n, rented, span, taux) in sorted(by_type.items())
+        ],
+        "par_chantier": sorted(
+            ({"chantier": c, "nb_mouvements": n, "nb_capteurs": nb_capteurs, "jours_loues": round((s or 0.0) / DAY, 1)}
+             for c, n, s, nb_capteurs, _ in by_chantier),
+            key=lambda c: c["jours_loues"], reverse=True
+        ),
+        "intervalles_retours": {
+            "nb": len(intervals),
+            "moyenne_jours": round(statistics.fmean(intervals), 1) if intervals else None,
+            "min": round(min(intervals), 3) if intervals else None,
+            "max": round(max(intervals), 3) if intervals else None,
+            **_percentiles(intervals),
+            "histogramme": _histogram(intervals, INTERVAL_BOUNDS),
+        },
+        # Retours saisis sans date de départ : temps loué inconnu
+        "mouvements_sans_depart": sum(row[4] or 0 for row in by_chantier),
+        "capteurs": capteurs,
+    }
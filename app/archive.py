@@ -0,0 +1,84 @@
+import argparse
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app import models
+
+load_dotenv()
+
+# 🗄️ Rétention : les réponses et mouvements plus anciens que l'horizon quittent les tables
+# chaudes pour leurs tables d'archive. L'historique et les exports relisent l'archive quand
+# la période demandée commence avant la limite d'archivage.
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "730"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))  # lignes déplacées par transaction
+
+# (table chaude, archive, colonne de date, compteur dans archive_runs)
+ARCHIVES = (
+    (models.ChecklistResponse, models.ChecklistResponseArchive, "date_checked", "nb_responses"),
+    (models.SensorMovement, models.SensorMovementArchive, "date_retour", "nb_movements"),
+)
+
+
+def archived_until(db: Session) -> Optional[datetime]:
+    """Limite d'archivage : aucune ligne postérieure n'est dans l'archive (None : archive vide)."""
+    return db.query(func.max(models.ArchiveRun.cutoff)).scalar()
+
+
+def includes_archive(db: Session, start_date: Optional[date] = None) -> bool:
+    cutoff = archived_until(db)
+    if cutoff is None:
+        return False
+    return start_date is None or datetime.combine(start_date, time.min) < cutoff
+
+
+def _move_batch(db: Session, hot, archived, date_column, cutoff) -> int:
+    ids = [i for (i,) in db.query(hot.id).filter(getattr(hot, date_column) < cutoff).limit(ARCHIVE_BATCH_SIZE)]
+    if ids:
+        columns = [c.name for c in archived.__table__.columns]
+        db.execute(archived.__table__.insert().from_select(
+            columns, select(*[hot.__table__.c[c] for c in columns]).where(hot.id.in_(ids))
+        ))
+        db.execute(delete(hot).where(hot.id.in_(ids)))
+    return len(ids)
+
+
+def archiver(db: Session, horizon_days: int = ARCHIVE_AFTER_DAYS):
+    """Déplace les lignes plus anciennes que `horizon_days` ; une transaction par paquet."""
+    cutoff = datetime.utcnow() - timedelta(days=horizon_days)
+
+    # La limite est publiée avant le moindre déplacement : toute lecture qui démarre
+    # ensuite interroge aussi l'archive pour les périodes concernées.
+    run = models.ArchiveRun(cutoff=cutoff)
+    db.add(run)
+    db.commit()
+
+    for hot, archived, date_column, counter in ARCHIVES:
+        total = 0
+        while moved := _move_batch(db, hot, archived, date_column, cutoff):
+            total += moved
+            db.commit()
+        setattr(run, counter, total)
+    db.commit()
+    return {"cutoff": cutoff, "nb_responses": run.nb_responses, "nb_movements": run.nb_movements}
+
+
+if __name__ == "__main__":
+    # python -m app.archive [--days N] : à planifier (cron) en dehors des heures de pointe
+    from app.database import SessionLocal, engine
+    from app import schema
+
+    parser = argparse.ArgumentParser(description="Archive les réponses et mouvements anciens")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="horizon de rétention en jours")
+    args = parser.parse_args()
+
+    schema.bootstrap(engine)
+    db = SessionLocal()
+    try:
+        result = archiver(db, args.days)
+        print(f"✅ {result['nb_responses']} réponses et {result['nb_movements']} mouvements archivés "
+              f"(avant le {result['cutoff']:%Y-%m-%d})")
+    finally:
+        db.close()
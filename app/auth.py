@@ -1,3 +1,6 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -5,7 +8,8 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app import models
+from app import models, schemas
+from app.cache import MemoryLRUBackend, MISSING
 import os
 
 # Charger .env
@@ -16,15 +20,47 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 👤 Cache des utilisateurs authentifiés (clé = "sub" du token)
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+# Si activé, require_manager se fie au rôle signé dans le token sans lire la base
+TRUST_TOKEN_ROLE = os.getenv("TRUST_TOKEN_ROLE", "false").lower() == "true"
+
+user_cache = MemoryLRUBackend(max_entries=USER_CACHE_SIZE)
+
+# 🔑 bcrypt : coût configurable, les hashs d'un autre coût sont mis à jour à la connexion
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Pool dédié au hashing (bcrypt libère le GIL) + file d'attente bornée au-delà de laquelle on répond 503
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", "64"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_MAX_QUEUE)
+
+def _submit_hash_task(fn, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Trop de connexions simultanées, réessayez dans un instant",
+            headers={"Retry-After": "1"},
+        )
+    future = _hash_executor.submit(fn, *args)
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
+
 # 🔐 Hasher les mots de passe
 def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
+    return _submit_hash_task(pwd_context.verify, plain, hashed).result()
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return _submit_hash_task(pwd_context.hash, password).result()
+
+async def verify_and_update_password(plain, hashed):
+    """(valide, nouveau_hash) sans bloquer la boucle ; nouveau_hash est None si le coût n'a pas changé."""
+    return await asyncio.wrap_future(_submit_hash_task(pwd_context.verify_and_update, plain, hashed))
 
 # 🔐 Créer un token JWT
 def create_access_token(data: dict, expires_delta: timedelta = None):
@@ -33,8 +69,10 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-# 🔐 Extraire l'utilisateur depuis le token
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def invalidate_user(user_id: str):
+    user_cache.delete(user_id)
+
+def _decode_token(token: str):
     credentials_exception = HTTPException(
         status_code=401,
         detail="Token invalide ou expiré",
@@ -42,19 +80,45 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
+        if payload.get("sub") is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    return payload
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
+def _load_user(db: Session, user_id: str):
+    user = user_cache.get(user_id)
+    if user is not MISSING:
+        return user
+
+    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    if db_user is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Token invalide ou expiré",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    # Copie immuable (sans le hash du mot de passe), partagée entre requêtes et threads
+    user = schemas.CurrentUser.model_validate(db_user)
+    user_cache.set(user_id, user, USER_CACHE_TTL)
     return user
 
+# 🔐 Extraire l'utilisateur depuis le token
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    payload = _decode_token(token)
+    return _load_user(db, payload["sub"])
+
 # 🔒 Vérifier rôle manager
-def require_manager(user: models.User = Depends(get_current_user)):
+def require_manager(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    payload = _decode_token(token)
+    if TRUST_TOKEN_ROLE and payload.get("role"):
+        if payload["role"] != "manager":
+            raise HTTPException(status_code=403, detail="Accès réservé aux managers")
+        cached = user_cache.get(payload["sub"])
+        # Seuls id et role sont garantis quand l'utilisateur n'est pas en cache
+        return cached if cached is not MISSING else schemas.CurrentUser(id=payload["sub"], role=payload["role"])
+
+    user = _load_user(db, payload["sub"])
     if user.role != "manager":
         raise HTTPException(status_code=403, detail="Accès réservé aux managers")
-    return user
\ No newline at end of file
+    return user
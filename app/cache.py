@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ⏱️ Durée de vie (secondes) des réponses mises en cache, par route
+TTL_ROUTES = {
+    "dashboard": int(os.getenv("CACHE_TTL_DASHBOARD", "30")),
+    "sensors": int(os.getenv("CACHE_TTL_SENSORS", "15")),
+    "analytics": int(os.getenv("CACHE_TTL_ANALYTICS", "300")),
+}
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Interface d'un stockage de cache : une autre implémentation (Redis...) peut être branchée via configure().
+
+    Classe abstraite : un backend incomplet échoue dès son instanciation.
+    """
+
+    @abstractmethod
+    def get(self, key):
+        ...
+
+    @abstractmethod
+    def set(self, key, value, ttl: int):
+        ...
+
+    @abstractmethod
+    def delete(self, key):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+
+class MemoryLRUBackend(CacheBackend):
+    """Cache mémoire du process, borné en nombre d'entrées (éviction LRU) avec expiration par entrée."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: int):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        # Chaque espace de noms a une génération : l'invalider rend toutes ses clés obsolètes d'un coup
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def _key(self, namespace: str, key: str):
+        return f"{namespace}:{self._generations.get(namespace, 0)}:{key}"
+
+    def get_or_set(self, namespace: str, key: str, compute):
+        full_key = self._key(namespace, key)
+        value = self.backend.get(full_key)
+        if value is not MISSING:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            self.misses += 1
+        value = compute()
+        # Si une écriture a invalidé l'espace pendant le calcul, la clé n'est déjà plus lue
+        self.backend.set(full_key, value, TTL_ROUTES.get(namespace, 0))
+        return value
+
+    def invalidate(self, *namespaces: str):
+        with self._lock:
+            for namespace in namespaces:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total * 100, 1) if total else 0.0,
+            "ttl_routes": TTL_ROUTES,
+        }
+
+
+cache = ResponseCache(MemoryLRUBackend())
+
+
+def configure(backend: CacheBackend):
+    cache.backend = backend
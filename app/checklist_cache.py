@@ -0,0 +1,85 @@
+import os
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session, selectinload
+from dotenv import load_dotenv
+from app import models, schemas
+from app.cache import MemoryLRUBackend, MISSING
+
+load_dotenv()
+
+# 📋 Modèles de checklist par (type, sous-type), déjà séparés avant / après maintenance.
+# Invalidés localement par crud.create_checklist ; le TTL borne le décalage entre workers.
+CHECKLIST_CACHE_TTL = int(os.getenv("CHECKLIST_CACHE_TTL", "300"))
+CHECKLIST_CACHE_SIZE = int(os.getenv("CHECKLIST_CACHE_SIZE", "1000"))
+
+_templates = MemoryLRUBackend(max_entries=CHECKLIST_CACHE_SIZE)
+
+
+def _to_template(checklist: models.Checklist) -> schemas.SensorReturnResponse:
+    before_items, after_items = [], []
+    for item in checklist.items:
+        dto = schemas.ChecklistItemReadSeparated(id=item.id, label=item.label)
+        if item.is_before:
+            before_items.append(dto)
+        else:
+            after_items.append(dto)
+    return schemas.SensorReturnResponse(
+        checklist_id=checklist.id,
+        before_maintenance=before_items,
+        after_maintenance=after_items
+    )
+
+
+def get_template(db: Session, type: str, subtype: str):
+    template = _templates.get((type, subtype))
+    if template is not MISSING:
+        return template
+
+    checklist = db.query(models.Checklist)\
+        .options(selectinload(models.Checklist.items))\
+        .filter_by(type=type, subtype=subtype)\
+        .first()
+    if not checklist:
+        return None  # pas mis en cache : la checklist peut être créée plus tard
+    template = _to_template(checklist)
+    _templates.set((type, subtype), template, CHECKLIST_CACHE_TTL)
+    return template
+
+
+def get_templates(db: Session, keys):
+    """{(type, subtype): modèle} pour plusieurs clés ; les absents du cache sont chargés en une requête."""
+    templates, missing = {}, []
+    for key in set(keys):
+        template = _templates.get(key)
+        if template is MISSING:
+            missing.append(key)
+        else:
+            templates[key] = template
+
+    if missing:
+        checklists = db.query(models.Checklist)\
+            .options(selectinload(models.Checklist.items))\
+            .filter(tuple_(models.Checklist.type, models.Checklist.subtype).in_(missing))\
+            .all()
+        for checklist in checklists:
+            key = (checklist.type, checklist.subtype)
+            if key not in templates:
+                templates[key] = _to_template(checklist)
+                _templates.set(key, templates[key], CHECKLIST_CACHE_TTL)
+    return templates
+
+
+def warm(db: Session):
+    """Charge tous les modèles en deux requêtes (checklists + items), au démarrage."""
+    checklists = db.query(models.Checklist).options(selectinload(models.Checklist.items)).all()
+    loaded = set()
+    for checklist in checklists:
+        key = (checklist.type, checklist.subtype)
+        if key not in loaded:
+            _templates.set(key, _to_template(checklist), CHECKLIST_CACHE_TTL)
+            loaded.add(key)
+    return len(loaded)
+
+
+def invalidate(type: str, subtype: str):
+    _templates.delete((type, subtype))
@@ -0,0 +1,91 @@
+from sqlalchemy import func, select, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import models
+
+# ✅ État courant des checklists : une ligne par (capteur, point, avant/après), la plus récente.
+# Évite de relire tout l'historique des réponses pour savoir « où en est » un capteur.
+STATE_COLUMNS = ("sensor_id", "item_id", "is_before", "is_checked", "user_id", "date_checked")
+
+
+def upsert(db: Session, rows):
+    """Écrase l'état des clés reçues dans la transaction en cours (sans commit)."""
+    state = models.ChecklistCurrentState.__table__
+    # Une seule ligne par clé : la dernière du lot l'emporte
+    latest = {(r["sensor_id"], r["item_id"], r["is_before"]): r for r in rows}
+    lignes = [{c: r[c] for c in STATE_COLUMNS} for r in latest.values()]
+    if not lignes:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        for i in range(0, len(lignes), 1000):
+            stmt = insert(state).values(lignes[i:i + 1000])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[state.c.sensor_id, state.c.item_id, state.c.is_before],
+                set_={c: stmt.excluded[c] for c in ("is_checked", "user_id", "date_checked")},
+                # Une réponse plus ancienne rejouée n'écrase pas un état plus récent
+                where=state.c.date_checked <= stmt.excluded.date_checked
+            )
+            db.execute(stmt)
+        return
+
+    for ligne in lignes:
+        result = db.execute(
+            update(state)
+            .where(state.c.sensor_id == ligne["sensor_id"], state.c.item_id == ligne["item_id"],
+                   state.c.is_before == ligne["is_before"], state.c.date_checked <= ligne["date_checked"])
+            .values(is_checked=ligne["is_checked"], user_id=ligne["user_id"], date_checked=ligne["date_checked"])
+        )
+        if result.rowcount == 0 and not db.get(
+                models.ChecklistCurrentState, (ligne["sensor_id"], ligne["item_id"], ligne["is_before"])):
+            db.execute(state.insert().values(**ligne))
+
+
+def get_state(db: Session, sensor_id: str):
+    """Lecture directe de l'état, libellés des points compris (une requête)."""
+    state = models.ChecklistCurrentState
+    return db.query(state, models.ChecklistItem.label)\
+        .join(models.ChecklistItem, models.ChecklistItem.id == state.item_id)\
+        .filter(state.sensor_id == sensor_id)\
+        .order_by(state.is_before.desc(), models.ChecklistItem.label)\
+        .all()
+
+
+# 🔁 Reconstruction complète depuis checklist_responses
+
+def reconstruire(db: Session):
+    # Réponses chaudes et archivées : un point répondu il y a longtemps garde son état
+    r = union_all(*[
+        select(model.id, *[getattr(model, c) for c in STATE_COLUMNS])
+        .where(model.sensor_id.isnot(None), model.item_id.isnot(None))
+        for model in (models.ChecklistResponse, models.ChecklistResponseArchive)
+    ]).subquery()
+    rang = func.row_number().over(
+        partition_by=(r.c.sensor_id, r.c.item_id, r.c.is_before),
+        order_by=(r.c.date_checked.desc(), r.c.id.desc())
+    ).label("rang")
+    dernieres = select(*[r.c[c] for c in STATE_COLUMNS], rang).subquery()
+
+    db.query(models.ChecklistCurrentState).delete()
+    result = db.execute(
+        models.ChecklistCurrentState.__table__.insert().from_select(
+            STATE_COLUMNS,
+            select(*[dernieres.c[c] for c in STATE_COLUMNS]).where(dernieres.c.rang == 1)
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    # python -m app.checklist_state : régénère l'état courant depuis l'historique des réponses
+    from app.database import SessionLocal, engine
+    from app import schema
+    schema.bootstrap(engine)
+    db = SessionLocal()
+    try:
+        print(f"✅ {reconstruire(db)} états de checklist reconstruits")
+    finally:
+        db.close()
@@ -1,18 +1,150 @@
-from sqlalchemy.orm import Session
-from app import models, schemas, auth
-from typing import Optional
-from datetime import date
+import base64
+from collections import Counter, defaultdict
+import csv
+import io
+from sqlalchemy import tuple_, insert, select, union
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+from fastapi import HTTPException
+from pydantic import ValidationError
+from app import models, schemas, auth, rollups, archive, checklist_cache, checklist_state, imports, sync, events
+from app.cache import cache
+from typing import Optional, List
+from datetime import date, datetime
 
 
 def create_sensor(db: Session, sensor: schemas.SensorCreate, user_id: str):
     db_sensor = models.Sensor(**sensor.dict(), created_by=user_id)
     db.add(db_sensor)
+    db.flush()
+    sync.record(db, "sensors", [db_sensor.id])
     db.commit()
-    db.refresh(db_sensor)
+    cache.invalidate("sensors", "dashboard")
+    db.refresh(db_sensor)  # déjà rechargé pour la réponse : pas de requête en plus
+    events.broker.publish(
+        events.SENSOR_CREATED, sensor_id=db_sensor.id, reference=db_sensor.reference,
+        status=db_sensor.status.value, chantier=db_sensor.chantier
+    )
     return db_sensor
 
-def get_all_sensors(db: Session):
-    return db.query(models.Sensor).all()
+
+def _insert_sensor_batch(db: Session, batch, summary):
+    # Doublons avec la base résolus en une requête IN pour tout le paquet
+    existing = _existing_ids(db, models.Sensor.reference, [s.reference for _, s in batch])
+    rows = []
+    for line, sensor in batch:
+        if sensor.reference in existing:
+            summary["duplicates"] += 1
+            _import_error(summary, line, sensor.reference, ["Référence déjà existante"])
+        else:
+            rows.append({**sensor.model_dump(), "id": models.generate_uuid(), "date_creation": datetime.utcnow()})
+    if rows:
+        db.execute(insert(models.Sensor), rows)
+        sync.record(db, "sensors", [r["id"] for r in rows])
+    db.commit()
+    summary["inserted"] += len(rows)
+
+
+def _import_error(summary, line, reference, messages):
+    summary["nb_errors"] += 1
+    if len(summary["errors"]) < imports.IMPORT_MAX_ERRORS:
+        summary["errors"].append({"line": line, "reference": reference, "errors": messages})
+
+
+def import_sensors(db: Session, rows):
+    """Import en flux : validation ligne à ligne, insertion par transactions de IMPORT_BATCH_SIZE."""
+    summary = {"total": 0, "inserted": 0, "duplicates": 0, "nb_errors": 0, "errors": [], "aborted": None}
+    batch, references = [], set()  # `references` : doublons internes au paquet en cours
+    try:
+        for line, row in rows:
+            summary["total"] += 1
+            try:
+                sensor = schemas.SensorCreate(**{k: v for k, v in row.items() if v is not None})
+            except ValidationError as e:
+                _import_error(summary, line, row.get("reference"),
+                              [f"{'.'.join(map(str, err['loc']))} : {err['msg']}" for err in e.errors()])
+                continue
+            if sensor.reference in references:
+                summary["duplicates"] += 1
+                _import_error(summary, line, sensor.reference, ["Référence en double dans le fichier"])
+                continue
+            batch.append((line, sensor))
+            references.add(sensor.reference)
+            if len(batch) >= imports.IMPORT_BATCH_SIZE:
+                _insert_sensor_batch(db, batch, summary)
+                batch, references = [], set()
+    except ValueError as e:
+        # Fichier illisible en cours de route : les paquets déjà validés restent enregistrés
+        summary["aborted"] = str(e)
+    if batch:
+        _insert_sensor_batch(db, batch, summary)
+
+    if summary["inserted"]:
+        cache.invalidate("sensors", "dashboard")
+    return summary
+
+
+SENSOR_FIELDS = ("id", "reference", "type", "subtype", "status", "chantier", "date_creation")
+
+
+def encode_sensor_cursor(date_creation: datetime, sensor_id: str) -> str:
+    raw = f"{date_creation.isoformat()}|{sensor_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_sensor_cursor(cursor: str):
+    try:
+        date_creation, sensor_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(date_creation), sensor_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+
+def get_sensors_page(
+    db: Session,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    status: Optional[schemas.SensorStatus] = None,
+    type: Optional[str] = None,
+    subtype: Optional[str] = None,
+    chantier: Optional[str] = None,
+    fields: Optional[List[str]] = None
+):
+    # 🔹 Projection : on ne sélectionne que les colonnes demandées (+ celles du curseur)
+    fields = list(fields or SENSOR_FIELDS)
+    inconnus = [f for f in fields if f not in SENSOR_FIELDS]
+    if inconnus:
+        raise HTTPException(status_code=400, detail=f"Champs inconnus : {', '.join(inconnus)}")
+    colonnes = list(dict.fromkeys(fields + ["date_creation", "id"]))
+    query = db.query(*[getattr(models.Sensor, c) for c in colonnes])
+
+    # 🔍 Filtres
+    if status:
+        query = query.filter(models.Sensor.status == status)
+    if type:
+        query = query.filter(models.Sensor.type == type)
+    if subtype:
+        query = query.filter(models.Sensor.subtype == subtype)
+    if chantier:
+        query = query.filter(models.Sensor.chantier == chantier)
+
+    # 📄 Pagination par clé (date_creation, id) : coût constant quelle que soit la page
+    if cursor:
+        cursor_date, cursor_id = decode_sensor_cursor(cursor)
+        query = query.filter(
+            tuple_(models.Sensor.date_creation, models.Sensor.id) > tuple_(cursor_date, cursor_id)
+        )
+    rows = query.order_by(models.Sensor.date_creation, models.Sensor.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_sensor_cursor(rows[-1].date_creation, rows[-1].id)
+
+    return {
+        "items": [{f: getattr(row, f) for f in fields} for row in rows],
+        "next_cursor": next_cursor
+    }
 
 
 def create_checklist(db: Session, checklist_data: schemas.ChecklistCreate):
@@ -23,72 +155,229 @@ def create_checklist(db: Session, checklist_data: schemas.ChecklistCreate):
     db.add(checklist)
     db.flush()  # pour obtenir l'ID sans commit complet
 
-    for item in checklist_data.items:
-        checklist_item = models.ChecklistItem(
-            checklist_id=checklist.id,
-            label=item.label,
-            is_before=item.is_before
-        )
-        db.add(checklist_item)
+    checklist_items = [
+        models.ChecklistItem(checklist_id=checklist.id, label=item.label, is_before=item.is_before)
+        for item in checklist_data.items
+    ]
+    db.add_all(checklist_items)
+    db.flush()
+    sync.record(db, "checklists", [checklist.id])
+    sync.record(db, "checklist_items", [item.id for item in checklist_items])
 
     db.commit()
+    checklist_cache.invalidate(checklist.type, checklist.subtype)
     db.refresh(checklist)
     return checklist
 
+def bump_history_versions(db: Session, sensor_ids, chunk_size: int = 500):
+    # Dans la transaction de l'écriture : l'ETag change au commit, pas avant.
+    # Ordre trié : deux lots concurrents verrouillent les lignes dans le même ordre.
+    sensor_ids = sorted(set(sensor_ids))
+    for i in range(0, len(sensor_ids), chunk_size):
+        db.query(models.Sensor)\
+            .filter(models.Sensor.id.in_(sensor_ids[i:i + chunk_size]))\
+            .update({models.Sensor.history_version: models.Sensor.history_version + 1},
+                    synchronize_session=False)
+
+
+def get_history_version(db: Session, sensor_id: str) -> int:
+    version = db.query(models.Sensor.history_version).filter(models.Sensor.id == sensor_id).scalar()
+    if version is None:
+        raise HTTPException(status_code=404, detail="Capteur introuvable")
+    return version
+
+
+def _return_events(movements):
+    # Lu avant le commit (qui expire les objets), publié après : jamais de retour annulé diffusé
+    return [
+        {"sensor_id": m.sensor_id, "movement_id": m.id, "chantier": m.chantier, "date_retour": m.date_retour}
+        for m in movements
+    ]
+
+
+def _publish_returns(return_events):
+    for data in return_events:
+        events.broker.publish(events.SENSOR_RETURNED, **data)
+
+
 def process_sensor_return(db: Session, return_data: schemas.SensorReturnRequest):
     # 1. Récupérer le capteur
-    sensor = db.query(models.Sensor).filter(models.Sensor.id == return_data.sensor_id).first()
+    sensor = db.query(models.Sensor.id, models.Sensor.type, models.Sensor.subtype)\
+        .filter(models.Sensor.id == return_data.sensor_id).first()
     if not sensor:
         raise HTTPException(status_code=404, detail="Capteur non trouvé")
 
-    # 2. Enregistrer le retour chantier
+    # 2. Checklist du type/sous-type, déjà séparée avant/après (cache des modèles)
+    template = checklist_cache.get_template(db, sensor.type, sensor.subtype)
+    if not template:
+        raise HTTPException(status_code=404, detail="Checklist introuvable pour ce type de capteur")
+
+    # 3. Enregistrer le retour chantier
     movement = models.SensorMovement(
         sensor_id=sensor.id,
         chantier=return_data.chantier,
         date_retour=return_data.date_retour or datetime.utcnow()
     )
     db.add(movement)
+    db.flush()
+    bump_history_versions(db, [sensor.id])
 
-    # 3. Récupérer la checklist associée au type/sous-type
-    checklist = db.query(models.Checklist).filter_by(
-        type=sensor.type,
-        subtype=sensor.subtype
-    ).first()
+    # 📊 Compteurs du dashboard, dans la même transaction que le mouvement
+    rollups.incrementer(db, rollups.compteurs_retour(movement))
+    return_events = _return_events([movement])
+    # Journal de synchro en dernier : après les verrous de ligne, au plus près du commit
+    sync.record(db, "sensor_movements", [movement.id])
+    db.commit()
+    cache.invalidate("dashboard")
+    _publish_returns(return_events)
 
-    if not checklist:
-        raise HTTPException(status_code=404, detail="Checklist introuvable pour ce type de capteur")
+    return template
 
-    db.commit()
+def process_sensor_returns(db: Session, data: schemas.SensorReturnBatchRequest):
+    # 1. Tous les capteurs du lot en une requête
+    sensor_ids = {r.sensor_id for r in data.returns}
+    sensors = {
+        s.id: s for s in db.query(models.Sensor.id, models.Sensor.type, models.Sensor.subtype)
+        .filter(models.Sensor.id.in_(sensor_ids))
+    }
 
-    # 4. Séparer les items
-    before_items = []
-    after_items = []
+    # 2. Un modèle de checklist par (type, sous-type) distinct
+    templates = checklist_cache.get_templates(db, [(s.type, s.subtype) for s in sensors.values()])
 
-    for item in checklist.items:
-        dto = schemas.ChecklistItemReadSeparated(id=item.id, label=item.label)
-        if item.is_before:
-            before_items.append(dto)
-        else:
-            after_items.append(dto)
+    # 3. Tous les mouvements valides dans une seule transaction
+    now = datetime.utcnow()
+    results, movements = [], []
+    for r in data.returns:
+        sensor = sensors.get(r.sensor_id)
+        if not sensor:
+            results.append(schemas.SensorReturnBatchItem(sensor_id=r.sensor_id, ok=False, error="Capteur non trouvé"))
+            continue
+        template = templates.get((sensor.type, sensor.subtype))
+        if not template:
+            results.append(schemas.SensorReturnBatchItem(
+                sensor_id=r.sensor_id, ok=False, error="Checklist introuvable pour ce type de capteur"
+            ))
+            continue
+        movements.append(models.SensorMovement(
+            sensor_id=sensor.id,
+            chantier=r.chantier,
+            date_retour=r.date_retour or now
+        ))
+        results.append(schemas.SensorReturnBatchItem(sensor_id=r.sensor_id, ok=True, checklist=template))
+
+    if movements:
+        db.add_all(movements)
+        db.flush()
+        bump_history_versions(db, [m.sensor_id for m in movements])
+        compteurs = Counter()
+        for movement in movements:
+            compteurs.update(rollups.compteurs_retour(movement))
+        rollups.incrementer(db, compteurs)
+        return_events = _return_events(movements)
+        sync.record(db, "sensor_movements", [m.id for m in movements])
+        db.commit()
+        cache.invalidate("dashboard")
+        _publish_returns(return_events)
 
-    return schemas.SensorReturnResponse(
-        checklist_id=checklist.id,
-        before_maintenance=before_items,
-        after_maintenance=after_items
+    return schemas.SensorReturnBatchResponse(
+        nb_ok=len(movements),
+        nb_errors=len(results) - len(movements),
+        results=results
     )
 
-def create_checklist_responses(db: Session, data: schemas.ChecklistResponseBatch):
-    for item in data.responses:
-        response = models.ChecklistResponse(
-            sensor_id=item.sensor_id,
-            item_id=item.item_id,
-            user_id=item.user_id,
-            is_checked=item.is_checked,
-            is_before=item.is_before
-        )
-        db.add(response)
-    db.commit()
-    return {"message": "Checklist enregistrée avec succès"}
+def _existing_ids(db: Session, column, ids, chunk_size: int = 500):
+    # Résolution en lot : une requête IN par tranche plutôt qu'une par référence
+    ids = list(ids)
+    found = set()
+    for i in range(0, len(ids), chunk_size):
+        found.update(v for (v,) in db.query(column).filter(column.in_(ids[i:i + chunk_size])))
+    return found
+
+
+def _validate_response_references(db: Session, responses):
+    unknown = {}
+    for field, column in (
+        ("sensor_id", models.Sensor.id),
+        ("item_id", models.ChecklistItem.id),
+        ("user_id", models.User.id),
+    ):
+        wanted = {getattr(r, field) for r in responses}
+        missing = wanted - _existing_ids(db, column, wanted)
+        if missing:
+            unknown[field] = sorted(missing)
+    if unknown:
+        raise HTTPException(status_code=422, detail={"message": "Références inconnues", "unknown": unknown})
+
+
+RESPONSE_COLUMNS = ("id", "sensor_id", "user_id", "item_id", "is_checked", "is_before", "date_checked")
+
+
+def _copy_responses(db: Session, rows):
+    # PostgreSQL : COPY dans la transaction de la session
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for r in rows:
+        writer.writerow([r[c] for c in RESPONSE_COLUMNS])
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    cursor.copy_expert(
+        f"COPY checklist_responses ({', '.join(RESPONSE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+
+def create_checklist_responses(
+    db: Session,
+    data: schemas.ChecklistResponseBatch,
+    idempotency_key: Optional[str] = None
+):
+    key = idempotency_key or data.idempotency_key
+    if key and db.get(models.ChecklistBatch, key):
+        return {"message": "Checklist déjà enregistrée", "inserted": 0}
+
+    # 1. Validation de tout le lot avant la moindre écriture
+    _validate_response_references(db, data.responses)
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": models.generate_uuid(),
+            "sensor_id": item.sensor_id,
+            "user_id": item.user_id,
+            "item_id": item.item_id,
+            "is_checked": item.is_checked,
+            "is_before": item.is_before,
+            "date_checked": now,
+        }
+        for item in data.responses
+    ]
+
+    try:
+        # 2. La clé d'idempotence est réservée dans la même transaction que les réponses
+        if key:
+            db.add(models.ChecklistBatch(idempotency_key=key, nb_responses=len(rows)))
+            db.flush()
+
+        # 3. Insertion ensembliste : COPY sur PostgreSQL, INSERT multi-lignes ailleurs
+        if rows:
+            if db.get_bind().dialect.name == "postgresql":
+                _copy_responses(db, rows)
+            else:
+                db.execute(insert(models.ChecklistResponse), rows)
+            bump_history_versions(db, [r["sensor_id"] for r in rows])
+            checklist_state.upsert(db, rows)
+
+        rollups.incrementer(db, rollups.compteurs_reponses(data.responses))
+        db.commit()
+    except IntegrityError:
+        # Lot rejoué en parallèle avec la même clé : déjà enregistré
+        db.rollback()
+        if key and db.get(models.ChecklistBatch, key):
+            return {"message": "Checklist déjà enregistrée", "inserted": 0}
+        raise
+
+    cache.invalidate("dashboard")
+    return {"message": "Checklist enregistrée avec succès", "inserted": len(rows)}
 
 def create_user(db: Session, user_data: schemas.UserCreate, role: str):
     hashed_password = auth.get_password_hash(user_data.password)
@@ -101,46 +390,63 @@ def create_user(db: Session, user_data: schemas.UserCreate, role: str):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    auth.invalidate_user(db_user.id)
     return db_user
 
 
-def get_sensor_history(
-    db: Session,
-    sensor_id: str,
-    chantier: Optional[str] = None,
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None
-):
-    sensor = db.query(models.Sensor).filter(models.Sensor.id == sensor_id).first()
-    if not sensor:
-        raise HTTPException(status_code=404, detail="Capteur introuvable")
-
-    # 🔍 Mouvements filtrés
-    mouvements_query = db.query(models.SensorMovement).filter_by(sensor_id=sensor_id)
-    if chantier:
-        mouvements_query = mouvements_query.filter(models.SensorMovement.chantier == chantier)
+def _responses_query(db: Session, sensor_ids, start_date=None, end_date=None, model=models.ChecklistResponse):
+    # item et user chargés en jointure : pas de requête par réponse (N+1)
+    responses_query = db.query(model)\
+        .options(joinedload(model.item), joinedload(model.user))\
+        .filter(model.sensor_id.in_(sensor_ids))
     if start_date:
-        mouvements_query = mouvements_query.filter(models.SensorMovement.date_retour >= start_date)
+        responses_query = responses_query.filter(model.date_checked >= start_date)
     if end_date:
-        mouvements_query = mouvements_query.filter(models.SensorMovement.date_retour <= end_date)
-    mouvements = mouvements_query.all()
+        responses_query = responses_query.filter(model.date_checked <= end_date)
+    return responses_query
+
 
-    # 🔍 Réponses checklist filtrées
-    responses_query = db.query(models.ChecklistResponse).filter_by(sensor_id=sensor_id)
+def _movements_query(db: Session, sensor_ids, chantier=None, start_date=None, end_date=None,
+                     model=models.SensorMovement):
+    mouvements_query = db.query(model).filter(model.sensor_id.in_(sensor_ids))
+    if chantier:
+        mouvements_query = mouvements_query.filter(model.chantier == chantier)
     if start_date:
-        responses_query = responses_query.filter(models.ChecklistResponse.date_checked >= start_date)
+        mouvements_query = mouvements_query.filter(model.date_retour >= start_date)
     if end_date:
-        responses_query = responses_query.filter(models.ChecklistResponse.date_checked <= end_date)
-    responses = responses_query.all()
+        mouvements_query = mouvements_query.filter(model.date_retour <= end_date)
+    return mouvements_query
+
+
+def _history_responses(db: Session, sensor_ids, start_date=None, end_date=None, with_archive=False):
+    # 🗄️ Archive d'abord (lignes plus anciennes), puis table chaude
+    responses = []
+    if with_archive:
+        responses += _responses_query(db, sensor_ids, start_date, end_date, models.ChecklistResponseArchive).all()
+    return responses + _responses_query(db, sensor_ids, start_date, end_date).all()
+
+
+def _history_movements(db: Session, sensor_ids, chantier=None, start_date=None, end_date=None, with_archive=False):
+    mouvements = []
+    if with_archive:
+        mouvements += _movements_query(
+            db, sensor_ids, chantier, start_date, end_date, models.SensorMovementArchive
+        ).all()
+    return mouvements + _movements_query(db, sensor_ids, chantier, start_date, end_date).all()
+
 
+def _build_history(sensor, mouvements, responses, users):
     avant, apres = [], []
     for resp in responses:
+        # un seul UserRead par technicien, réutilisé pour toutes ses réponses
+        if resp.user_id not in users:
+            users[resp.user_id] = schemas.UserRead.model_validate(resp.user)
         dto = schemas.ChecklistResponseItem(
             item_id=resp.item_id,
             label=resp.item.label,
             is_checked=resp.is_checked,
             is_before=resp.is_before,
-            user=resp.user,
+            user=users[resp.user_id],
             date_checked=resp.date_checked
         )
         if resp.is_before:
@@ -154,4 +460,89 @@ def get_sensor_history(
         subtype=sensor.subtype,
         mouvements=mouvements,
         checklist_responses={"avant": avant, "apres": apres}
-    )
\ No newline at end of file
+    )
+
+
+def get_checklist_state(db: Session, sensor_id: str):
+    avant, apres = [], []
+    for state, label in checklist_state.get_state(db, sensor_id):
+        dto = schemas.ChecklistStateItem(
+            item_id=state.item_id,
+            label=label,
+            is_checked=state.is_checked,
+            user_id=state.user_id,
+            date_checked=state.date_checked
+        )
+        (avant if state.is_before else apres).append(dto)
+    return schemas.ChecklistStateResponse(sensor_id=sensor_id, avant=avant, apres=apres)
+
+
+def get_sensor_responses(
+    db: Session,
+    sensor_id: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+):
+    with_archive = archive.includes_archive(db, start_date)
+    return _history_responses(db, [sensor_id], start_date, end_date, with_archive)
+
+
+def get_sensor_movements(db: Session, sensor_id: str):
+    return _history_movements(db, [sensor_id], with_archive=archive.includes_archive(db))
+
+
+def get_sensor_history(
+    db: Session,
+    sensor_id: str,
+    chantier: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+):
+    sensor = db.query(models.Sensor).filter(models.Sensor.id == sensor_id).first()
+    if not sensor:
+        raise HTTPException(status_code=404, detail="Capteur introuvable")
+
+    # 🔍 Mouvements et réponses checklist filtrés
+    with_archive = archive.includes_archive(db, start_date)
+    mouvements = _history_movements(db, [sensor_id], chantier, start_date, end_date, with_archive)
+    responses = _history_responses(db, [sensor_id], start_date, end_date, with_archive)
+
+    return _build_history(sensor, mouvements, responses, {})
+
+
+HISTORY_BATCH_MAX_SENSORS = 1000
+
+
+def get_sensors_history(db: Session, data: schemas.SensorHistoryBatchRequest):
+    if not data.sensor_ids and not data.chantier:
+        raise HTTPException(status_code=400, detail="Indiquer sensor_ids ou chantier")
+
+    # 1. Capteurs demandés, ou présents / passés sur le chantier
+    sensors_query = db.query(models.Sensor)
+    if data.sensor_ids:
+        sensors_query = sensors_query.filter(models.Sensor.id.in_(set(data.sensor_ids)))
+    else:
+        # UNION plutôt qu'un OR : chaque branche lit son index (sensors.chantier, sensor_movements.chantier)
+        sur_chantier = select(models.Sensor.id).where(models.Sensor.chantier == data.chantier)
+        passes = select(models.SensorMovement.sensor_id).where(models.SensorMovement.chantier == data.chantier)
+        sensors_query = sensors_query.filter(models.Sensor.id.in_(union(sur_chantier, passes)))
+    sensors = sensors_query.order_by(models.Sensor.reference).limit(HISTORY_BATCH_MAX_SENSORS + 1).all()
+    if len(sensors) > HISTORY_BATCH_MAX_SENSORS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Trop de capteurs (maximum {HISTORY_BATCH_MAX_SENSORS} par appel)"
+        )
+    ids = [s.id for s in sensors]
+    if not ids:
+        return []
+
+    # 2. Mouvements et réponses de tous les capteurs : une requête chacun, regroupés en Python
+    mouvements, responses = defaultdict(list), defaultdict(list)
+    with_archive = archive.includes_archive(db, data.start_date)
+    for m in _history_movements(db, ids, data.chantier, data.start_date, data.end_date, with_archive):
+        mouvements[m.sensor_id].append(m)
+    for r in _history_responses(db, ids, data.start_date, data.end_date, with_archive):
+        responses[r.sensor_id].append(r)
+
+    users = {}
+    return [_build_history(s, mouvements[s.id], responses[s.id], users) for s in sensors]
@@ -0,0 +1,119 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 📡 Diffusion en direct des événements capteurs (retours, créations) vers les clients abonnés.
+# Pub/sub en mémoire : chaque worker ne diffuse que les écritures qu'il a lui-même traitées.
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))        # événements en attente par abonné
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "10000"))  # ~4 Ko par abonné inactif
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))         # secondes entre deux pings
+
+SENSOR_CREATED = "sensor_created"
+SENSOR_RETURNED = "sensor_returned"
+
+DROPPED = object()  # fin de flux : l'abonné n'a pas suivi le rythme
+
+
+class Subscriber:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+        self.dropped = False
+
+    def _offer(self, event):
+        # Toujours exécuté dans la boucle de l'abonné
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Consommateur lent : on le déconnecte plutôt que de bufferiser sans limite
+            self.dropped = True
+            broker.unsubscribe(self)
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(DROPPED)
+
+
+class Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self):
+        subscriber = Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            if len(self._subscribers) >= EVENTS_MAX_SUBSCRIBERS:
+                return None
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.discard(subscriber)
+                self.dropped += subscriber.dropped
+
+    def publish(self, type: str, **data):
+        """Appelable depuis n'importe quel thread (crud tourne dans le threadpool) ; ne bloque jamais."""
+        with self._lock:
+            event = {"id": next(self._ids), "type": type, "date": datetime.utcnow().isoformat(), **data}
+            subscribers = list(self._subscribers)
+            self.published += 1
+        # Un seul réveil par boucle d'événements, quel que soit le nombre d'abonnés
+        by_loop = defaultdict(list)
+        for subscriber in subscribers:
+            by_loop[subscriber.loop].append(subscriber)
+        for loop, targets in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, targets, event)
+            except RuntimeError:
+                for subscriber in targets:
+                    self.unsubscribe(subscriber)  # boucle fermée
+
+    def stats(self):
+        with self._lock:
+            return {"subscribers": len(self._subscribers), "published": self.published, "dropped": self.dropped}
+
+
+def _deliver(subscribers, event):
+    for subscriber in subscribers:
+        subscriber._offer(event)
+
+
+broker = Broker()
+
+
+def format_sse(event) -> str:
+    payload = json.dumps(event, ensure_ascii=False, default=str)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+
+async def stream(subscriber, sensor_ids=None):
+    """Flux SSE d'un abonné ; se termine par un événement `dropped` s'il a pris trop de retard."""
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"  # garde la connexion ouverte derrière les proxys
+                continue
+            if event is DROPPED:
+                yield "event: dropped\ndata: {}\n\n"
+                return
+            if sensor_ids and event.get("sensor_id") not in sensor_ids:
+                continue
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(subscriber)
@@ -0,0 +1,198 @@
+import hashlib
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app import models
+
+load_dotenv()
+
+# 📁 Exports générés hors requête, conservés sur disque puis purgés après expiration
+EXPORT_RESULTS_DIR = os.getenv("EXPORT_RESULTS_DIR", "export_results")
+EXPORT_RESULT_TTL = int(os.getenv("EXPORT_RESULT_TTL", "3600"))
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+EXPORT_MAX_PENDING = int(os.getenv("EXPORT_MAX_PENDING", "20"))
+
+EXTENSIONS = {"excel": "xlsx", "pdf": "pdf"}
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{40}-(excel|pdf)$")
+
+_executor = None
+_lock = threading.RLock()
+_pending = {}  # job_id -> Future, pour les jobs lancés par ce process
+
+
+def _get_executor():
+    # spawn : pas de fork d'un serveur multithreadé (verrous, connexions et threads hérités)
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=EXPORT_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _reset_executor(broken):
+    # Pool cassé (process tué : OOM, signal) : le prochain export en démarre un neuf
+    global _executor
+    with _lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _path(job_id: str, suffix: str) -> str:
+    return os.path.join(EXPORT_RESULTS_DIR, f"{job_id}.{suffix}")
+
+
+def _sensor_key(sensor_id: str) -> str:
+    return hashlib.sha1(sensor_id.encode()).hexdigest()[:12]
+
+
+def belongs_to(job_id: str, sensor_id: str) -> bool:
+    """Le job a-t-il été lancé pour ce capteur ? (préfixe de l'identifiant)"""
+    return job_id.startswith(_sensor_key(sensor_id))
+
+
+def job_format(job_id: str) -> str:
+    # L'identifiant porte le capteur et le format : "<clé capteur><sha1 tronqué>-excel" / "-pdf"
+    match = JOB_ID_PATTERN.match(job_id)
+    if not match:
+        raise HTTPException(status_code=404, detail="Export introuvable")
+    return match.group(1)
+
+
+def result_path(job_id: str) -> str:
+    return _path(job_id, EXTENSIONS[job_format(job_id)])
+
+
+def history_fingerprint(db: Session, sensor_id: str) -> str:
+    """Empreinte de l'historique : change dès qu'un mouvement ou une réponse est ajouté."""
+    movements = select(func.count(models.SensorMovement.id), func.max(models.SensorMovement.date_retour))\
+        .where(models.SensorMovement.sensor_id == sensor_id)
+    responses = select(func.count(models.ChecklistResponse.id), func.max(models.ChecklistResponse.date_checked))\
+        .where(models.ChecklistResponse.sensor_id == sensor_id)
+    sensor = db.query(models.Sensor.type, models.Sensor.subtype).filter(models.Sensor.id == sensor_id).first()
+    parts = [sensor_id, *sensor, *db.execute(movements).one(), *db.execute(responses).one()]
+    return "|".join(str(p) for p in parts)
+
+
+def _fail(job_id: str, message: str):
+    with open(_path(job_id, "error"), "w") as f:
+        f.write(message)
+
+
+def _run_job(job_id: str, sensor_id: str):
+    """Exécuté dans un process du pool : rend l'export dans le répertoire de résultats."""
+    from app.database import SessionLocal
+    from app import exports, crud
+
+    format = job_format(job_id)
+    final_path = result_path(job_id)
+    # Fichier temporaire propre à cette exécution : deux workers sur le même job n'écrivent
+    # jamais dans le même fichier, os.replace publie l'un ou l'autre en entier
+    fd, tmp_path = tempfile.mkstemp(dir=EXPORT_RESULTS_DIR, prefix=f"{job_id}.", suffix=".tmp")
+    os.close(fd)
+    db = SessionLocal()
+    try:
+        sensor = db.query(models.Sensor).filter(models.Sensor.id == sensor_id).first()
+        if sensor is None:
+            _fail(job_id, "Capteur introuvable")  # supprimé entre la demande et le rendu
+            return
+        if format == "pdf":
+            mouvements = crud.get_sensor_movements(db, sensor_id)
+            responses = crud.get_sensor_responses(db, sensor_id)
+            avant = [r for r in responses if r.is_before]
+            apres = [r for r in responses if not r.is_before]
+            exports.write_sensor_history_pdf(sensor, mouvements, avant, apres, tmp_path)
+        else:
+            exports.write_sensor_history_excel(db, sensor, tmp_path)
+        os.replace(tmp_path, final_path)
+    except Exception as e:
+        _fail(job_id, str(e))
+        raise
+    finally:
+        db.close()
+        for leftover in (tmp_path, _path(job_id, "pending")):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+def _on_done(job_id: str, future):
+    # Process du pool mort en cours de rendu : _run_job n'a rien pu nettoyer
+    if future.cancelled() or not isinstance(future.exception(), BrokenProcessPool):
+        return
+    _fail(job_id, "Le processus d'export s'est arrêté avant la fin")
+    if os.path.exists(_path(job_id, "pending")):
+        os.remove(_path(job_id, "pending"))
+
+
+def purge_expired():
+    if not os.path.isdir(EXPORT_RESULTS_DIR):
+        return
+    limit = time.time() - EXPORT_RESULT_TTL
+    for name in os.listdir(EXPORT_RESULTS_DIR):
+        path = os.path.join(EXPORT_RESULTS_DIR, name)
+        try:
+            if os.path.getmtime(path) < limit:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def get_job(job_id: str):
+    """Statut lu sur disque : visible depuis tous les workers de l'API."""
+    job = {"job_id": job_id, "format": job_format(job_id)}
+    if os.path.exists(result_path(job_id)):
+        return {**job, "status": "done"}
+    if os.path.exists(_path(job_id, "error")):
+        with open(_path(job_id, "error")) as f:
+            return {**job, "status": "failed", "error": f.read()}
+    if (job_id in _pending and not _pending[job_id].done()) or os.path.exists(_path(job_id, "pending")):
+        return {**job, "status": "pending"}
+    return None
+
+
+def submit(db: Session, sensor_id: str, format: str):
+    if format not in EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Format d'export inconnu")
+    os.makedirs(EXPORT_RESULTS_DIR, exist_ok=True)
+    purge_expired()
+
+    # Même capteur, même historique, même format → même job (et même fichier)
+    fingerprint = history_fingerprint(db, sensor_id)
+    job_id = f"{_sensor_key(sensor_id)}{hashlib.sha1(fingerprint.encode()).hexdigest()[:28]}-{format}"
+
+    with _lock:
+        job = get_job(job_id)
+        if job and job["status"] == "done":
+            os.utime(result_path(job_id))  # repousse l'expiration du fichier réutilisé
+            return job
+        if job and job["status"] == "pending":
+            return job
+        if job:
+            os.remove(_path(job_id, "error"))
+
+        for done_id in [j for j, f in _pending.items() if f.done()]:
+            del _pending[done_id]
+        if len(_pending) >= EXPORT_MAX_PENDING:
+            raise HTTPException(status_code=503, detail="Trop d'exports en cours, réessayez plus tard")
+
+        with open(_path(job_id, "pending"), "w") as f:
+            f.write(sensor_id)
+        executor = _get_executor()
+        try:
+            future = executor.submit(_run_job, job_id, sensor_id)
+        except BrokenProcessPool:
+            _reset_executor(executor)
+            future = _get_executor().submit(_run_job, job_id, sensor_id)
+        future.add_done_callback(lambda f: _on_done(job_id, f))
+        _pending[job_id] = future
+    return {"job_id": job_id, "format": format, "status": "pending"}
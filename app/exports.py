@@ -1,14 +1,60 @@
 import io
-from openpyxl import Workbook
+import os
+import tempfile
+from sqlalchemy.orm import joinedload
+from app import archive, models
 from fastapi.responses import StreamingResponse
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import cm
+from starlette.background import BackgroundTask
 
-def generate_sensor_history_excel(sensor, mouvements, avant, apres):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Historique capteur"
+# openpyxl / reportlab sont importés au premier export : ~300 ms de moins au démarrage d'un worker
+
+EXPORT_CHUNK_SIZE = 1000  # lignes lues par aller-retour DB pendant un export
+EXCEL_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PDF_MEDIA_TYPE = "application/pdf"
+
+
+def _remove(path):
+    # Appelée par le flux et par la tâche de fond de la réponse : la première l'emporte
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _iter_file(path, chunk_size=64 * 1024):
+    # Envoie le fichier par morceaux puis le supprime (même si le client coupe la connexion)
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+    finally:
+        _remove(path)
+
+
+def _write_checklist_rows(ws, db, sensor_id, is_before, response_models):
+    for model in response_models:
+        responses = db.query(model)\
+            .options(joinedload(model.item), joinedload(model.user))\
+            .filter(model.sensor_id == sensor_id, model.is_before == is_before)\
+            .order_by(model.date_checked)\
+            .yield_per(EXPORT_CHUNK_SIZE)
+        for r in responses:
+            ws.append([r.item.label, "✔" if r.is_checked else "✘", r.user.name, r.date_checked])
+
+
+def write_sensor_history_excel(db, sensor, target):
+    # Classeur en écriture seule : les lignes partent sur disque au fil de l'eau,
+    # la mémoire reste constante quelle que soit la taille de l'historique.
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Historique capteur")
+
+    # 🗄️ Historique complet : tables d'archive d'abord (lignes plus anciennes) si elles servent
+    movement_models, response_models = [models.SensorMovement], [models.ChecklistResponse]
+    if archive.includes_archive(db):
+        movement_models.insert(0, models.SensorMovementArchive)
+        response_models.insert(0, models.ChecklistResponseArchive)
 
     # 🔹 Infos capteur
     ws.append(["ID", sensor.id])
@@ -16,41 +62,57 @@ def generate_sensor_history_excel(sensor, mouvements, avant, apres):
     ws.append(["Sous-type", sensor.subtype])
     ws.append([])
 
-    # 🔹 Mouvements
+    # 🔹 Mouvements (lus par paquets via un curseur côté serveur)
     ws.append(["--- Mouvements ---"])
     ws.append(["Chantier", "Date départ", "Date retour", "Commentaire"])
-    for m in mouvements:
-        ws.append([m.chantier, m.date_depart, m.date_retour, m.commentaire])
+    for model in movement_models:
+        mouvements = db.query(model)\
+            .filter(model.sensor_id == sensor.id)\
+            .order_by(model.date_retour)\
+            .yield_per(EXPORT_CHUNK_SIZE)
+        for m in mouvements:
+            ws.append([m.chantier, m.date_depart, m.date_retour, m.commentaire])
     ws.append([])
 
     # 🔹 Checklist avant
     ws.append(["--- Checklist AVANT maintenance ---"])
     ws.append(["Item", "Coché", "Technicien", "Date"])
-    for r in avant:
-        ws.append([r.label, "✔" if r.is_checked else "✘", r.user.name, r.date_checked])
+    _write_checklist_rows(ws, db, sensor.id, True, response_models)
     ws.append([])
 
     # 🔹 Checklist après
     ws.append(["--- Checklist APRÈS maintenance ---"])
     ws.append(["Item", "Coché", "Technicien", "Date"])
-    for r in apres:
-        ws.append([r.label, "✔" if r.is_checked else "✘", r.user.name, r.date_checked])
+    _write_checklist_rows(ws, db, sensor.id, False, response_models)
+
+    wb.save(target)
 
-    # 🔽 Export
-    file_stream = io.BytesIO()
-    wb.save(file_stream)
-    file_stream.seek(0)
 
+def generate_sensor_history_excel(db, sensor):
+    # 🔽 Export : fichier temporaire envoyé par morceaux
+    tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+    tmp.close()
+    try:
+        write_sensor_history_excel(db, sensor, tmp.name)
+    except Exception:
+        _remove(tmp.name)
+        raise
+
+    # Tâche de fond : supprime aussi le fichier quand le flux n'a jamais démarré
     return StreamingResponse(
-        file_stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=historique_{sensor.id}.xlsx"}
+        _iter_file(tmp.name),
+        media_type=EXCEL_MEDIA_TYPE,
+        headers={"Content-Disposition": f"attachment; filename=historique_{sensor.id}.xlsx"},
+        background=BackgroundTask(_remove, tmp.name)
     )
 
 
-def generate_sensor_history_pdf(sensor, mouvements, avant, apres):
-    buffer = io.BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=A4)
+def write_sensor_history_pdf(sensor, mouvements, avant, apres, target):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.pdfgen import canvas
+
+    pdf = canvas.Canvas(target, pagesize=A4)
     pdf.setTitle(f"Historique capteur {sensor.id}")
 
     x, y = 2 * cm, 28 * cm
@@ -82,18 +144,23 @@ def generate_sensor_history_pdf(sensor, mouvements, avant, apres):
     # Checklist AVANT
     write_line("--- Checklist AVANT maintenance ---", bold=True)
     for r in avant:
-        write_line(f"[{'✔' if r.is_checked else '✘'}] {r.label} par {r.user.name} le {r.date_checked}")
+        write_line(f"[{'✔' if r.is_checked else '✘'}] {r.item.label} par {r.user.name} le {r.date_checked}")
     write_line("")
 
     # Checklist APRÈS
     write_line("--- Checklist APRÈS maintenance ---", bold=True)
     for r in apres:
-        write_line(f"[{'✔' if r.is_checked else '✘'}] {r.label} par {r.user.name} le {r.date_checked}")
+        write_line(f"[{'✔' if r.is_checked else '✘'}] {r.item.label} par {r.user.name} le {r.date_checked}")
 
     pdf.save()
+
+
+def generate_sensor_history_pdf(sensor, mouvements, avant, apres):
+    buffer = io.BytesIO()
+    write_sensor_history_pdf(sensor, mouvements, avant, apres, buffer)
     buffer.seek(0)
     return StreamingResponse(
         buffer,
-        media_type="application/pdf",
+        media_type=PDF_MEDIA_TYPE,
         headers={"Content-Disposition": f"attachment; filename=historique_{sensor.id}.pdf"}
     )
\ No newline at end of file
@@ -0,0 +1,96 @@
+import codecs
+import csv
+import os
+import zipfile
+import zlib
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))  # lignes par transaction
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))  # erreurs détaillées dans le résumé
+
+SENSOR_IMPORT_COLUMNS = ("reference", "type", "subtype", "status", "chantier")
+
+
+def _clean(value):
+    # Cellule vide → None ; nombres Excel (références numériques) → texte
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _rows(header, records):
+    """(numéro de ligne, dict) pour chaque ligne non vide, colonnes normalisées."""
+    columns = [str(h).strip().lower() if h is not None else "" for h in header]
+    missing = [c for c in ("reference", "type", "subtype") if c not in columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+
+    def rows():
+        for line, record in enumerate(records, start=2):
+            row = {c: _clean(v) for c, v in zip(columns, record) if c in SENSOR_IMPORT_COLUMNS}
+            if any(v is not None for v in row.values()):
+                yield line, row
+    return rows()
+
+
+def _reading(records, errors, message):
+    """Relaie les lignes ; une erreur de lecture en cours de fichier devient un ValueError."""
+    try:
+        yield from records
+    except errors as e:
+        raise ValueError(f"{message} : {e}") from e
+
+
+def iter_csv_rows(binary_file):
+    # Décodage au fil de la lecture : le fichier n'est jamais chargé en entier
+    reader = csv.reader(codecs.iterdecode(binary_file, "utf-8-sig"), delimiter=_sniff_delimiter(binary_file))
+    records = _reading(reader, csv.Error, "CSV illisible")
+    header = next(records, None)
+    if header is None:
+        raise ValueError("Fichier vide")
+    return _rows(header, records)
+
+
+def _sniff_delimiter(binary_file):
+    # Exports Excel français : séparateur « ; »
+    first_line = binary_file.readline()
+    binary_file.seek(0)
+    return ";" if first_line.count(b";") > first_line.count(b",") else ","
+
+
+def iter_xlsx_rows(binary_file):
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    # Lecture seule : les lignes sont lues à la demande depuis l'archive
+    try:
+        wb = load_workbook(binary_file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+        raise ValueError("Fichier XLSX illisible") from e
+    # Archive tronquée ou XML corrompu, découverts en cours de lecture
+    records = _reading(wb.worksheets[0].iter_rows(values_only=True),
+                       (zipfile.BadZipFile, KeyError, SyntaxError, zlib.error, EOFError), "XLSX illisible")
+    try:
+        header = next(records, None)
+        if header is None:
+            raise ValueError("Fichier vide")
+        rows = _rows(header, records)
+    except ValueError:
+        wb.close()
+        raise
+
+    def closing():
+        try:
+            yield from rows
+        finally:
+            wb.close()
+    return closing()
+
+
+def iter_sensor_rows(filename: str, binary_file):
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension == ".csv":
+        return iter_csv_rows(binary_file)
+    if extension == ".xlsx":
+        return iter_xlsx_rows(binary_file)
+    raise ValueError("Format non pris en charge (CSV ou XLSX attendu)")
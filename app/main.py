@@ -1,13 +1,29 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.database import engine
-from app.models import Base
+from app.database import engine, SessionLocal
+from app import checklist_cache, schema
+from app.metrics import MetricsMiddleware, instrument_engine
 from app.routers import sensors
 from app.routers import checklists
 from app.routers import users
 from app.routers import dashboard
+from app.routers import monitoring
+from app.routers import sync
+from app.routers import events
+from app.routers import analytics
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 📋 Préchargement des modèles de checklist pour les retours capteurs
+    db = SessionLocal()
+    try:
+        checklist_cache.warm(db)
+    finally:
+        db.close()
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,8 +32,11 @@ app.add_middleware(
     allow_methods=["*"],  # ⬅️ très important pour autoriser les OPTIONS, POST, etc.
     allow_headers=["*"],  # ⬅️ permet les headers comme Authorization
 )
-# 👇 Crée toutes les tables à partir des modèles
-Base.metadata.create_all(bind=engine)
+# 📈 Latence / requêtes SQL par route, exposées sur /metrics
+instrument_engine(engine)
+app.add_middleware(MetricsMiddleware)
+# 👇 Crée / complète les tables, seulement si les modèles ont changé depuis le dernier démarrage
+schema.bootstrap(engine)
 
 @app.get("/")
 def root():
@@ -29,4 +48,14 @@ app.include_router(checklists.router)
 
 app.include_router(users.router)
 
-app.include_router(dashboard.router)
\ No newline at end of file
+app.include_router(dashboard.router)
+
+app.include_router(monitoring.router)
+
+app.include_router(monitoring.metrics_router)
+
+app.include_router(sync.router)
+
+app.include_router(events.router)
+
+app.include_router(analytics.router)
\ No newline at end of file
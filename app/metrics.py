@@ -0,0 +1,163 @@
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 📈 Instrumentation par route : latence, nombre de requêtes SQL, temps DB, taille de réponse
+N_PLUS_ONE_QUERY_THRESHOLD = int(os.getenv("N_PLUS_ONE_QUERY_THRESHOLD", "20"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+logger = logging.getLogger("gmao.metrics")
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# Statistiques de la requête HTTP en cours (copiées dans le threadpool avec le contexte)
+_current: ContextVar = ContextVar("gmao_request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}        # (method, route, status) -> nb
+        self.latency = {}         # (method, route) -> Histogram
+        self.queries = {}         # (method, route) -> Histogram
+        self.db_time = {}         # (method, route) -> secondes
+        self.response_bytes = {}  # (method, route) -> octets
+
+    def observe(self, method, route, status, duration, stats: RequestStats, size):
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(duration)
+            self.queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+            self.db_time[key] = self.db_time.get(key, 0.0) + stats.db_time
+            self.response_bytes[key] = self.response_bytes.get(key, 0) + size
+
+    def render(self) -> str:
+        """Format texte d'exposition Prometheus (version 0.0.4)."""
+        lines = []
+
+        def labels(method, route, **extra):
+            items = {"method": method, "route": route, **extra}
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items.items()) + "}"
+
+        def histogram(name, help_text, data):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route), h in sorted(data.items()):
+                for bound, n in zip(h.buckets, h.counts):
+                    lines.append(f"{name}_bucket{labels(method, route, le=_format(bound))} {n}")
+                lines.append(f"{name}_bucket{labels(method, route, le='+Inf')} {h.count}")
+                lines.append(f"{name}_sum{labels(method, route)} {_format(h.sum)}")
+                lines.append(f"{name}_count{labels(method, route)} {h.count}")
+
+        def counter(name, help_text, data):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (method, route), value in sorted(data.items()):
+                lines.append(f"{name}{labels(method, route)} {_format(value)}")
+
+        with self._lock:
+            lines.append("# HELP gmao_http_requests_total Requêtes HTTP traitées")
+            lines.append("# TYPE gmao_http_requests_total counter")
+            for (method, route, status), n in sorted(self.requests.items()):
+                lines.append(f"gmao_http_requests_total{labels(method, route, status=status)} {n}")
+            histogram("gmao_http_request_duration_seconds", "Latence des requêtes HTTP", self.latency)
+            histogram("gmao_db_queries_per_request", "Requêtes SQL émises par requête HTTP", self.queries)
+            counter("gmao_db_duration_seconds_total", "Temps passé en base", self.db_time)
+            counter("gmao_http_response_size_bytes_total", "Octets envoyés dans les réponses", self.response_bytes)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+
+def instrument_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("gmao_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["gmao_query_start"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """Middleware ASGI : mesure chaque requête HTTP et signale les suspicions de N+1."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status, size = 500, 0
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            _current.reset(token)
+            route = scope.get("route")
+            path = route.path if route is not None else "<non routé>"
+            registry.observe(scope["method"], path, status, duration, stats, size)
+            if stats.queries > N_PLUS_ONE_QUERY_THRESHOLD:
+                logger.warning(
+                    "N+1 suspect : %s %s a émis %d requêtes SQL (%.1f ms en base, seuil %d)",
+                    scope["method"], scope["path"], stats.queries, stats.db_time * 1000,
+                    N_PLUS_ONE_QUERY_THRESHOLD
+                )
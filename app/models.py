@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Enum, ForeignKey, Boolean, Text
+from sqlalchemy import Column, String, DateTime, Enum, ForeignKey, Boolean, Text, Integer, Index
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 import enum
@@ -47,6 +47,8 @@ class Sensor(Base):
     date_creation = Column(DateTime, default=datetime.utcnow)
     status = Column(Enum(SensorStatus), default=SensorStatus.available)
     chantier = Column(String, nullable=True)
+    # Incrémenté à chaque mouvement ou réponse checklist : sert d'ETag à l'historique
+    history_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     created_by = Column(String, ForeignKey("users.id"))
     created_by_user = relationship("User", back_populates="created_sensors")
@@ -54,6 +56,13 @@ class Sensor(Base):
     checklist_responses = relationship("ChecklistResponse", back_populates="sensor")
     movements = relationship("SensorMovement", back_populates="sensor")
 
+    __table_args__ = (
+        # Pagination par clé de GET /sensors
+        Index("ix_sensors_date_creation_id", "date_creation", "id"),
+        # Filtre chantier de la liste et de l'historique groupé
+        Index("ix_sensors_chantier", "chantier"),
+    )
+
 
 # 🔹 Checklist pour un type + sous-type de capteur
 class Checklist(Base):
@@ -65,6 +74,10 @@ class Checklist(Base):
 
     items = relationship("ChecklistItem", back_populates="checklist")
 
+    __table_args__ = (
+        Index("ix_checklists_type_subtype", "type", "subtype"),
+    )
+
 
 # 🔹 Éléments de checklist
 class ChecklistItem(Base):
@@ -77,6 +90,10 @@ class ChecklistItem(Base):
 
     checklist = relationship("Checklist", back_populates="items")
 
+    __table_args__ = (
+        Index("ix_checklist_items_checklist_id", "checklist_id"),
+    )
+
 
 # 🔹 Réponses aux checklists remplies par les techniciens
 class ChecklistResponse(Base):
@@ -87,12 +104,29 @@ class ChecklistResponse(Base):
     user_id = Column(String, ForeignKey("users.id"))
     item_id = Column(String, ForeignKey("checklist_items.id"))
     is_checked = Column(Boolean, default=False)
+    is_before = Column(Boolean, default=True)
     date_checked = Column(DateTime, default=datetime.utcnow)
 
     sensor = relationship("Sensor", back_populates="checklist_responses")
     user = relationship("User", back_populates="checklist_responses")
     item = relationship("ChecklistItem")
 
+    __table_args__ = (
+        # Historique / exports d'un capteur, filtrés par date
+        Index("ix_checklist_responses_sensor_id_date_checked", "sensor_id", "date_checked"),
+        # Compteurs par technicien (reconstruction des rollups, top techniciens)
+        Index("ix_checklist_responses_user_id", "user_id"),
+    )
+
+
+# 🔹 Lots de réponses déjà reçus (clé d'idempotence envoyée par la tablette)
+class ChecklistBatch(Base):
+    __tablename__ = "checklist_batches"
+
+    idempotency_key = Column(String, primary_key=True)
+    nb_responses = Column(Integer, nullable=False)
+    date_received = Column(DateTime, default=datetime.utcnow)
+
 
 # 🔹 Historique des mouvements de capteurs (chantier, dates)
 class SensorMovement(Base):
@@ -106,3 +140,105 @@ class SensorMovement(Base):
     commentaire = Column(Text, nullable=True)
 
     sensor = relationship("Sensor", back_populates="movements")
+
+    __table_args__ = (
+        # Historique d'un capteur et écarts entre retours (LAG partitionné par capteur)
+        Index("ix_sensor_movements_sensor_id_date_retour", "sensor_id", "date_retour"),
+        # Retours par période (reconstruction des rollups mensuels)
+        Index("ix_sensor_movements_date_retour", "date_retour"),
+        # Capteurs passés sur un chantier (historique groupé), lus depuis l'index seul
+        Index("ix_sensor_movements_chantier_sensor_id", "chantier", "sensor_id"),
+    )
+
+
+# 🔹 Compteurs du dashboard maintenus au fil des écritures (voir app/rollups.py)
+class DashboardRollup(Base):
+    __tablename__ = "dashboard_rollups"
+
+    categorie = Column(String, primary_key=True)  # retours_mois, checklist, capteur, technicien
+    cle = Column(String, primary_key=True)        # "2025-06", "total", id capteur, id utilisateur...
+    valeur = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_dashboard_rollups_categorie_valeur", "categorie", "valeur"),
+    )
+
+
+# 🗄️ Archives : lignes plus anciennes que l'horizon de rétention (voir app/archive.py),
+# mêmes colonnes que les tables chaudes pour être relues par l'historique et les exports
+class ChecklistResponseArchive(Base):
+    __tablename__ = "checklist_responses_archive"
+
+    id = Column(String, primary_key=True)
+    sensor_id = Column(String, ForeignKey("sensors.id"))
+    user_id = Column(String, ForeignKey("users.id"))
+    item_id = Column(String, ForeignKey("checklist_items.id"))
+    is_checked = Column(Boolean, default=False)
+    is_before = Column(Boolean, default=True)
+    date_checked = Column(DateTime)
+
+    user = relationship("User")
+    item = relationship("ChecklistItem")
+
+    __table_args__ = (
+        Index("ix_checklist_responses_archive_sensor_id_date_checked", "sensor_id", "date_checked"),
+    )
+
+
+class SensorMovementArchive(Base):
+    __tablename__ = "sensor_movements_archive"
+
+    id = Column(String, primary_key=True)
+    sensor_id = Column(String, ForeignKey("sensors.id"))
+    chantier = Column(String, nullable=False)
+    date_depart = Column(DateTime, nullable=True)
+    date_retour = Column(DateTime, nullable=True)
+    commentaire = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_sensor_movements_archive_sensor_id_date_retour", "sensor_id", "date_retour"),
+    )
+
+
+class ArchiveRun(Base):
+    __tablename__ = "archive_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cutoff = Column(DateTime, nullable=False)  # tout ce qui est antérieur peut être dans l'archive
+    date_run = Column(DateTime, default=datetime.utcnow)
+    nb_responses = Column(Integer, nullable=False, default=0)
+    nb_movements = Column(Integer, nullable=False, default=0)
+
+
+# 🔹 Dernier état connu de chaque point de checklist, par capteur (maintenu par crud)
+class ChecklistCurrentState(Base):
+    __tablename__ = "checklist_current_state"
+
+    sensor_id = Column(String, ForeignKey("sensors.id"), primary_key=True)
+    item_id = Column(String, ForeignKey("checklist_items.id"), primary_key=True)
+    is_before = Column(Boolean, primary_key=True)
+    is_checked = Column(Boolean, nullable=False)
+    user_id = Column(String, ForeignKey("users.id"))
+    date_checked = Column(DateTime, nullable=False)
+
+
+# 🔹 Journal des écritures, lu par GET /sync (synchronisation incrémentale des clients)
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)  # curseur de synchronisation
+    entity = Column(String, nullable=False)     # sensors, checklists, checklist_items, sensor_movements
+    entity_id = Column(String, nullable=False)
+    op = Column(String, nullable=False)         # insert, update
+    date_changed = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # SQLite : identifiants jamais réutilisés, un curseur reste valable
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+# 🔹 Empreinte du schéma appliqué (voir app/schema.py)
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(String, primary_key=True)
+    date_applied = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,154 @@
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import func, text, update, extract
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import models
+from app.cache import cache
+
+# Catégories de compteurs stockées dans dashboard_rollups
+RETOURS_MOIS = "retours_mois"
+CHECKLIST = "checklist"
+CAPTEUR = "capteur"
+TECHNICIEN = "technicien"
+
+
+def cle_mois(date: datetime) -> str:
+    return f"{date.year:04d}-{date.month:02d}"
+
+
+def incrementer(db: Session, compteurs: Counter):
+    """Ajoute les deltas {(categorie, cle): n} dans la transaction en cours (sans commit)."""
+    rollup = models.DashboardRollup.__table__
+    dialect = db.get_bind().dialect.name
+
+    # Ordre trié : deux lots concurrents verrouillent les lignes dans le même ordre (pas d'interblocage)
+    lignes = [
+        {"categorie": categorie, "cle": cle, "valeur": n}
+        for (categorie, cle), n in sorted(compteurs.items()) if n
+    ]
+    if not lignes:
+        return
+
+    if dialect in ("postgresql", "sqlite"):
+        # Upsert multi-lignes (par tranches pour rester sous la limite de paramètres)
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        for i in range(0, len(lignes), 1000):
+            stmt = insert(rollup).values(lignes[i:i + 1000])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[rollup.c.categorie, rollup.c.cle],
+                set_={"valeur": rollup.c.valeur + stmt.excluded.valeur}
+            )
+            db.execute(stmt)
+        return
+
+    for ligne in lignes:
+        result = db.execute(
+            update(rollup)
+            .where(rollup.c.categorie == ligne["categorie"], rollup.c.cle == ligne["cle"])
+            .values(valeur=rollup.c.valeur + ligne["valeur"])
+        )
+        if result.rowcount == 0:
+            db.execute(rollup.insert().values(**ligne))
+
+
+def compteurs_retour(movement: models.SensorMovement) -> Counter:
+    compteurs = Counter()
+    compteurs[(CAPTEUR, movement.sensor_id)] += 1
+    if movement.date_retour:
+        compteurs[(RETOURS_MOIS, cle_mois(movement.date_retour))] += 1
+    return compteurs
+
+
+def compteurs_reponses(responses) -> Counter:
+    compteurs = Counter()
+    for r in responses:
+        compteurs[(CHECKLIST, "total")] += 1
+        if r.is_checked:
+            compteurs[(CHECKLIST, "cochees")] += 1
+        if r.user_id:
+            compteurs[(TECHNICIEN, r.user_id)] += 1
+    return compteurs
+
+
+# 📖 Lectures utilisées par le dashboard
+
+def valeur(db: Session, categorie: str, cle: str) -> int:
+    v = db.query(models.DashboardRollup.valeur).filter_by(categorie=categorie, cle=cle).scalar()
+    return v or 0
+
+
+def top_capteurs(db: Session, limit: int = 5):
+    return db.query(models.DashboardRollup.cle, models.DashboardRollup.valeur)\
+        .filter(models.DashboardRollup.categorie == CAPTEUR)\
+        .order_by(models.DashboardRollup.valeur.desc())\
+        .limit(limit).all()
+
+
+def top_techniciens(db: Session, limit: int = 5):
+    total = func.sum(models.DashboardRollup.valeur)
+    return db.query(models.User.name, total.label("interventions"))\
+        .join(models.User, models.User.id == models.DashboardRollup.cle)\
+        .filter(models.DashboardRollup.categorie == TECHNICIEN)\
+        .group_by(models.User.name)\
+        .order_by(total.desc())\
+        .limit(limit).all()
+
+
+# 🔁 Reconstruction complète depuis les tables brutes
+
+def reconstruire(db: Session):
+    """Recalcule tous les compteurs ; utilisable à chaud.
+
+    Les compteurs sont vidés avant le comptage, ce qui verrouille la table (verrou explicite
+    sous PostgreSQL, verrou d'écriture sous SQLite) : les incréments concurrents attendent le
+    commit et s'appliquent après la reconstruction au lieu d'être perdus.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE dashboard_rollups IN EXCLUSIVE MODE"))
+    db.query(models.DashboardRollup).delete()
+    compteurs = Counter()
+
+    # Tables chaudes et archives (app/archive.py) : les compteurs couvrent tout l'historique
+    for movement in (models.SensorMovement, models.SensorMovementArchive):
+        annee = extract("year", movement.date_retour)
+        mois = extract("month", movement.date_retour)
+        for a, m, nb in db.query(annee, mois, func.count(movement.id))\
+                .filter(movement.date_retour.isnot(None))\
+                .group_by(annee, mois):
+            compteurs[(RETOURS_MOIS, f"{int(a):04d}-{int(m):02d}")] += nb
+
+        for sensor_id, nb in db.query(movement.sensor_id, func.count(movement.id))\
+                .group_by(movement.sensor_id):
+            if sensor_id:
+                compteurs[(CAPTEUR, sensor_id)] += nb
+
+    for response in (models.ChecklistResponse, models.ChecklistResponseArchive):
+        compteurs[(CHECKLIST, "total")] += db.query(response).count()
+        compteurs[(CHECKLIST, "cochees")] += db.query(response)\
+            .filter(response.is_checked == True).count()
+
+        for user_id, nb in db.query(response.user_id, func.count(response.id))\
+                .group_by(response.user_id):
+            if user_id:
+                compteurs[(TECHNICIEN, user_id)] += nb
+
+    db.bulk_insert_mappings(models.DashboardRollup, [
+        {"categorie": categorie, "cle": cle, "valeur": nb}
+        for (categorie, cle), nb in compteurs.items() if nb
+    ])
+    db.commit()
+    cache.invalidate("dashboard")
+    return len(compteurs)
+
+
+if __name__ == "__main__":
+    # python -m app.rollups : régénère les compteurs du dashboard
+    from app.database import SessionLocal, engine
+    from app import schema
+    schema.bootstrap(engine)
+    db = SessionLocal()
+    try:
+        print(f"✅ {reconstruire(db)} compteurs reconstruits")
+    finally:
+        db.close()
@@ -0,0 +1,33 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app import analytics
+from app.cache import cache
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+DEFAULT_WINDOW_DAYS = 365
+
+
+@router.get("/utilization")
+def get_utilization(
+    start_date: Optional[date] = Query(None, description="Début de la fenêtre (défaut : il y a un an)"),
+    end_date: Optional[date] = Query(None, description="Fin de la fenêtre, incluse (défaut : aujourd'hui)"),
+    include_sensors: bool = Query(False, description="Détail capteur par capteur"),
+    db: Session = Depends(get_db)
+):
+    end_date = end_date or datetime.utcnow().date()
+    start_date = start_date or end_date - timedelta(days=DEFAULT_WINDOW_DAYS)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date doit précéder end_date")
+
+    # ♻️ Un calcul par fenêtre ; le rapport tolère un décalage de CACHE_TTL_ANALYTICS secondes
+    start = datetime.combine(start_date, time.min)
+    end = min(datetime.combine(end_date + timedelta(days=1), time.min), datetime.utcnow())
+    report = cache.get_or_set(
+        "analytics", repr((start_date, end_date)),
+        lambda: analytics.compute_utilization(db, start, end)
+    )
+    return report if include_sensors else {k: v for k, v in report.items() if k != "capteurs"}
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
+from typing import Optional
 from sqlalchemy.orm import Session
 from app import schemas, crud
 from app.database import get_db
@@ -14,14 +15,10 @@ def create_checklist(checklist: schemas.ChecklistCreate, db: Session = Depends(g
     return crud.create_checklist(db, checklist)
 
 
-router = APIRouter(
-    prefix="/checklists",
-    tags=["checklists"]
-)
-
 @router.post("/responses")
 def submit_checklist_responses(
     data: schemas.ChecklistResponseBatch,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    return crud.create_checklist_responses(db, data)
\ No newline at end of file
+    return crud.create_checklist_responses(db, data, idempotency_key)
\ No newline at end of file
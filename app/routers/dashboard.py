@@ -1,58 +1,83 @@
+import sqlite3
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from sqlalchemy import func, cast, Integer
+from datetime import datetime
 from app.database import get_db
-from app import models
+from app import models, rollups
+from app.cache import cache
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+
+def _jours_entre(dialect, fin, debut):
+    # Équivalent SQL de (fin - debut).days côté Python (arrondi à l'inférieur)
+    if dialect.name == "postgresql":
+        return func.floor(func.extract("epoch", fin - debut) / 86400)
+    if dialect.name == "sqlite" and sqlite3.sqlite_version_info >= (3, 25):
+        millisecondes = func.round((func.julianday(fin) - func.julianday(debut)) * 86400000)
+        return cast(millisecondes, Integer) // 86400000
+    return None
+
+
+def _temps_moyen_entre_retours(db: Session):
+    """Moyenne en jours des écarts entre deux retours successifs d'un même capteur."""
+    precedent = func.lag(models.SensorMovement.date_retour).over(
+        partition_by=models.SensorMovement.sensor_id,
+        order_by=models.SensorMovement.date_retour
+    )
+    retours = db.query(
+        models.SensorMovement.date_retour.label("date_retour"),
+        precedent.label("precedent")
+    ).join(models.Sensor, models.Sensor.id == models.SensorMovement.sensor_id)\
+     .filter(models.SensorMovement.date_retour.isnot(None))\
+     .subquery()
+
+    jours = _jours_entre(db.get_bind().dialect, retours.c.date_retour, retours.c.precedent)
+    if jours is not None:
+        moyenne = db.query(func.avg(jours)).filter(retours.c.precedent.isnot(None)).scalar()
+        return round(float(moyenne), 1) if moyenne is not None else 0.0
+
+    # 🐢 Repli (SQLite sans fonctions de fenêtrage) : une seule requête triée, écarts calculés en Python
+    mouvements = db.query(models.SensorMovement.sensor_id, models.SensorMovement.date_retour)\
+        .join(models.Sensor, models.Sensor.id == models.SensorMovement.sensor_id)\
+        .filter(models.SensorMovement.date_retour.isnot(None))\
+        .order_by(models.SensorMovement.sensor_id, models.SensorMovement.date_retour.asc())
+    deltas = []
+    precedent_id, precedent_date = None, None
+    for sensor_id, date_retour in mouvements.yield_per(1000):
+        if sensor_id == precedent_id:
+            deltas.append((date_retour - precedent_date).days)
+        precedent_id, precedent_date = sensor_id, date_retour
+    return round(sum(deltas) / len(deltas), 1) if deltas else 0.0
+
+
 @router.get("/")
 def get_dashboard_data(db: Session = Depends(get_db)):
+    # ♻️ Servi depuis le cache tant qu'aucun retour / checklist n'a été enregistré
+    return cache.get_or_set("dashboard", "global", lambda: _calculer_dashboard(db))
+
+
+def _calculer_dashboard(db: Session):
     now = datetime.utcnow()
-    start_of_month = now.replace(day=1)
 
     # 🔄 Capteurs retournés ce mois
-    capteurs_retour_mois = db.query(models.SensorMovement)\
-        .filter(models.SensorMovement.date_retour >= start_of_month)\
-        .count()
+    capteurs_retour_mois = rollups.valeur(db, rollups.RETOURS_MOIS, rollups.cle_mois(now))
 
     # ✅ Taux de conformité checklist (taux de cases cochées)
-    total = db.query(models.ChecklistResponse).count()
-    cochées = db.query(models.ChecklistResponse).filter(models.ChecklistResponse.is_checked == True).count()
+    total = rollups.valeur(db, rollups.CHECKLIST, "total")
+    cochées = rollups.valeur(db, rollups.CHECKLIST, "cochees")
     taux_checklist = round((cochées / total * 100), 1) if total > 0 else 0.0
 
     # 📆 Temps moyen entre retours de capteurs
-    capteurs = db.query(models.Sensor).all()
-    deltas = []
-    for sensor in capteurs:
-        mouvements = db.query(models.SensorMovement)\
-            .filter(models.SensorMovement.sensor_id == sensor.id)\
-            .order_by(models.SensorMovement.date_retour.asc()).all()
-        if len(mouvements) > 1:
-            for i in range(1, len(mouvements)):
-                if mouvements[i - 1].date_retour and mouvements[i].date_retour:
-                    delta = (mouvements[i].date_retour - mouvements[i - 1].date_retour).days
-                    deltas.append(delta)
-    temps_moyen = round(sum(deltas) / len(deltas), 1) if deltas else 0.0
+    temps_moyen = _temps_moyen_entre_retours(db)
 
     # 🔧 Capteurs les plus souvent maintenus
-    top_maintenus = db.query(
-        models.SensorMovement.sensor_id,
-        func.count(models.SensorMovement.id).label("nb")
-    ).group_by(models.SensorMovement.sensor_id).order_by(func.count(models.SensorMovement.id).desc()).limit(5).all()
-
-    plus_maintenus = [{"capteur_id": r.sensor_id, "nb_interventions": r.nb} for r in top_maintenus]
+    top_maintenus = rollups.top_capteurs(db, limit=5)
+    plus_maintenus = [{"capteur_id": r.cle, "nb_interventions": r.valeur} for r in top_maintenus]
 
     # 🧑 Top techniciens
-    top_techs = db.query(
-        models.User.name,
-        func.count(models.ChecklistResponse.id).label("interventions")
-    ).join(models.ChecklistResponse.user)\
-     .group_by(models.User.name)\
-     .order_by(func.count(models.ChecklistResponse.id).desc())\
-     .limit(5).all()
-
+    top_techs = rollups.top_techniciens(db, limit=5)
     top_techniciens = [{"nom": r.name, "interventions": r.interventions} for r in top_techs]
 
     return {
@@ -0,0 +1,19 @@
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app import events
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.get("/sensors")
+async def sensor_events(sensor_id: Optional[List[str]] = Query(None, description="Filtrer sur ces capteurs")):
+    # Server-Sent Events : créations et retours de capteurs au fil de l'eau
+    subscriber = events.broker.subscribe()
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Trop d'abonnés au flux, réessayez plus tard")
+    return StreamingResponse(
+        events.stream(subscriber, set(sensor_id or ())),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
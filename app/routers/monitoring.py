@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.cache import cache
+from app.events import broker
+from app.database import pool_stats
+from app.metrics import registry
+
+router = APIRouter(prefix="/monitoring", tags=["monitoring"])
+metrics_router = APIRouter(tags=["monitoring"])
+
+@router.get("/cache")
+def get_cache_stats():
+    return cache.stats()
+
+
+@router.get("/pool")
+def get_pool_stats():
+    return pool_stats()
+
+
+@router.get("/events")
+def get_events_stats():
+    return broker.stats()
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    # Format texte Prometheus
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,25 +1,66 @@
-from fastapi import APIRouter, Depends
+import hashlib
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Request, Response
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app import crud, schemas
+from app import crud, schemas, models
+from app.cache import cache
 from typing import List
 from fastapi import Query
 from datetime import date
-from app.exports import generate_sensor_history_excel
+from app.exports import generate_sensor_history_excel, generate_sensor_history_pdf, EXCEL_MEDIA_TYPE, PDF_MEDIA_TYPE
+from app import export_jobs, imports
+from fastapi.responses import FileResponse
 from typing import Optional
 
 router = APIRouter(prefix="/sensors", tags=["sensors"])
 
+
+def _history_etag(sensor_id: str, version: int, *params) -> str:
+    # Version d'historique du capteur + paramètres de la vue (filtres, format)
+    digest = hashlib.sha1(repr((sensor_id, version) + params).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip().removeprefix("W/") for c in header.split(",")]
+    return "*" in candidates or etag in candidates
+
 @router.post("/", response_model=schemas.SensorRead)
 def create_sensor(sensor: schemas.SensorCreate, db: Session = Depends(get_db)):
     # user_id fictif pour tester
     return crud.create_sensor(db, sensor, user_id="1234")
 
+@router.post("/import", response_model=schemas.SensorImportSummary)
+def import_sensors(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    # Fichier lu ligne à ligne depuis le tampon d'upload, insertion par paquets
+    try:
+        rows = imports.iter_sensor_rows(file.filename, file.file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return crud.import_sensors(db, rows)
+
 from typing import List
 
-@router.get("/", response_model=List[schemas.SensorRead])
-def list_sensors(db: Session = Depends(get_db)):
-    return crud.get_all_sensors(db)
+@router.get("/", response_model=schemas.SensorPage, response_model_exclude_unset=True)
+def list_sensors(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    status: Optional[schemas.SensorStatus] = Query(None),
+    type: Optional[str] = Query(None),
+    subtype: Optional[str] = Query(None),
+    chantier: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Colonnes à renvoyer, séparées par des virgules"),
+    db: Session = Depends(get_db)
+):
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    params = (limit, cursor, status, type, subtype, chantier, tuple(field_list or ()))
+    return cache.get_or_set(
+        "sensors", repr(params),
+        lambda: crud.get_sensors_page(db, limit, cursor, status, type, subtype, chantier, field_list)
+    )
 
 
 @router.post("/sensor-return", response_model=schemas.SensorReturnResponse)
@@ -30,21 +71,62 @@ def sensor_return(
     return crud.process_sensor_return(db, return_data)
 
 
+@router.post("/sensor-return/batch", response_model=schemas.SensorReturnBatchResponse)
+def sensor_return_batch(
+    data: schemas.SensorReturnBatchRequest,
+    db: Session = Depends(get_db)
+):
+    # Fin de chantier : tous les capteurs rendus en un appel, erreurs signalées ligne par ligne
+    return crud.process_sensor_returns(db, data)
+
+
+
+@router.post("/history/batch", response_model=List[schemas.SensorHistoryResponse])
+def get_sensors_history(
+    data: schemas.SensorHistoryBatchRequest,
+    db: Session = Depends(get_db)
+):
+    # Revue d'un chantier : les historiques de tous ses capteurs en un appel
+    return crud.get_sensors_history(db, data)
+
 
 @router.get("/{sensor_id}/history", response_model=schemas.SensorHistoryResponse)
 def get_sensor_history(
     sensor_id: str,
+    request: Request,
+    response: Response,
     chantier: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     db: Session = Depends(get_db)
 ):
+    # 🔁 GET conditionnel : une seule lecture de la version avant toute requête d'historique
+    etag = _history_etag(sensor_id, crud.get_history_version(db, sensor_id), chantier, start_date, end_date)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return crud.get_sensor_history(db, sensor_id, chantier, start_date, end_date)
 
 
+@router.get("/{sensor_id}/checklist-state", response_model=schemas.ChecklistStateResponse)
+def get_checklist_state(
+    sensor_id: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    # État courant matérialisé : une lecture, sans parcourir l'historique des réponses
+    etag = _history_etag(sensor_id, crud.get_history_version(db, sensor_id), "checklist-state")
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return crud.get_checklist_state(db, sensor_id)
+
+
 @router.get("/{sensor_id}/history/export")
 def export_sensor_history(
     sensor_id: str,
+    request: Request,
     format: Optional[str] = "excel",
     db: Session = Depends(get_db)
 ):
@@ -52,13 +134,56 @@ def export_sensor_history(
     if not sensor:
         raise HTTPException(status_code=404, detail="Capteur introuvable")
 
-    mouvements = db.query(models.SensorMovement).filter_by(sensor_id=sensor_id).all()
-    responses = db.query(models.ChecklistResponse).filter_by(sensor_id=sensor_id).all()
+    # 🔁 Fichier inchangé depuis le dernier téléchargement : ni requête ni rendu
+    etag = _history_etag(sensor_id, sensor.history_version, "pdf" if format == "pdf" else "excel")
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    if format != "pdf":
+        # Excel : rendu en flux, les lignes sont lues par paquets
+        export = generate_sensor_history_excel(db, sensor)
+        export.headers["ETag"] = etag
+        return export
+
+    mouvements = crud.get_sensor_movements(db, sensor_id)
+    responses = crud.get_sensor_responses(db, sensor_id)
 
     avant = [r for r in responses if r.is_before]
     apres = [r for r in responses if not r.is_before]
 
-    if format == "pdf":
-        return generate_sensor_history_pdf(sensor, mouvements, avant, apres)
-    else:
-        return generate_sensor_history_excel(sensor, mouvements, avant, apres)
\ No newline at end of file
+    export = generate_sensor_history_pdf(sensor, mouvements, avant, apres)
+    export.headers["ETag"] = etag
+    return export
+
+
+@router.post("/{sensor_id}/history/export-jobs", status_code=202)
+def submit_export_job(
+    sensor_id: str,
+    format: Optional[str] = "excel",
+    db: Session = Depends(get_db)
+):
+    sensor = db.query(models.Sensor).filter(models.Sensor.id == sensor_id).first()
+    if not sensor:
+        raise HTTPException(status_code=404, detail="Capteur introuvable")
+    return export_jobs.submit(db, sensor_id, format)
+
+
+@router.get("/{sensor_id}/history/export-jobs/{job_id}")
+def get_export_job(sensor_id: str, job_id: str):
+    job = export_jobs.get_job(job_id)
+    if job is None or not export_jobs.belongs_to(job_id, sensor_id):
+        raise HTTPException(status_code=404, detail="Export introuvable")
+    return job
+
+
+@router.get("/{sensor_id}/history/export-jobs/{job_id}/download")
+def download_export_job(sensor_id: str, job_id: str):
+    job = export_jobs.get_job(job_id)
+    if job is None or job["status"] != "done" or not export_jobs.belongs_to(job_id, sensor_id):
+        raise HTTPException(status_code=404, detail="Export introuvable ou pas encore prêt")
+    extension = export_jobs.EXTENSIONS[job["format"]]
+    return FileResponse(
+        export_jobs.result_path(job_id),
+        media_type=EXCEL_MEDIA_TYPE if job["format"] == "excel" else PDF_MEDIA_TYPE,
+        filename=f"historique_{sensor_id}.{extension}"
+    )
\ No newline at end of file
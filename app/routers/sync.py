@@ -0,0 +1,30 @@
+import gzip
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app import sync
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+GZIP_MIN_SIZE = 1024  # en dessous, la compression coûte plus qu'elle ne rapporte
+
+
+@router.get("")
+def get_changes(
+    request: Request,
+    since: Optional[str] = Query(None, description="next_cursor de la page précédente (vide : depuis le début)"),
+    limit: int = Query(sync.SYNC_PAGE_SIZE, ge=1, le=sync.SYNC_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
+    page = sync.get_changes(db, sync.decode_cursor(since), limit)
+    body = json.dumps(jsonable_encoder(page), separators=(",", ":"), ensure_ascii=False).encode()
+
+    # 🗜️ Pages compressées pour les clients mobiles qui l'acceptent
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= GZIP_MIN_SIZE and "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, media_type="application/json", headers=headers)
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app import models, auth
 from app.database import get_db
@@ -12,19 +13,32 @@ from dotenv import load_dotenv
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_in_threadpool(
+        lambda: db.query(models.User).filter(models.User.email == form_data.username).first()
+    )
+    if not user:
+        raise HTTPException(status_code=400, detail="Identifiants incorrects")
+
+    # bcrypt tourne dans le pool dédié : les workers de l'API restent disponibles
+    valid, new_hash = await auth.verify_and_update_password(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=400, detail="Identifiants incorrects")
 
+    claims = {"sub": user.id, "role": user.role.value}
+    if new_hash:
+        # Coût bcrypt modifié depuis la création du compte : on re-hashe au passage
+        user.hashed_password = new_hash
+        await run_in_threadpool(db.commit)
+
     token = auth.create_access_token(
-        data={"sub": user.id},
+        data=claims,
         expires_delta=timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     return {"access_token": token, "token_type": "bearer"}
 
 @router.get("/me")
-def get_me(user: models.User = Depends(auth.get_current_user)):
+def get_me(user: schemas.CurrentUser = Depends(auth.get_current_user)):
     return {
         "id": user.id,
         "email": user.email,
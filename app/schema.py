@@ -0,0 +1,106 @@
+import hashlib
+import logging
+from datetime import datetime
+from sqlalchemy import delete, insert, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from app.models import Base, SchemaVersion
+
+logger = logging.getLogger("gmao.schema")
+
+ADVISORY_LOCK_KEY = 4242  # PostgreSQL : un seul worker applique le DDL
+# À incrémenter quand bootstrap applique du DDL qu'il ignorait : les bases déjà estampillées
+# par une version précédente repassent une fois dans bootstrap
+BOOTSTRAP_REVISION = 3
+
+
+def schema_fingerprint(metadata=Base.metadata) -> str:
+    """Empreinte des tables, colonnes et index déclarés dans les modèles."""
+    parts = [f"bootstrap:{BOOTSTRAP_REVISION}"]
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        parts.append(table.name)
+        for column in table.columns:
+            parts.append(f"{column.name}:{column.type!r}:{column.nullable}:{column.primary_key}")
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            parts.append(f"{index.name}:{[c.name for c in index.columns]}:{index.unique}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+SCHEMA_VERSION = schema_fingerprint()
+
+
+def current_version(engine):
+    with engine.connect() as conn:
+        try:
+            return conn.execute(select(SchemaVersion.version)).scalar()
+        except DBAPIError:
+            return None  # base vide : table de version pas encore créée
+
+
+def _add_missing_columns(conn):
+    # create_all ne touche pas aux tables existantes : colonnes ajoutées depuis, en ALTER TABLE
+    inspector = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column.type.compile(conn.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            conn.exec_driver_sql(ddl)
+            logger.info("Colonne ajoutée : %s.%s", table.name, column.name)
+
+
+def _add_missing_indexes(conn):
+    # Idem pour les index déclarés sur des tables qui existaient déjà (checkfirst : sans effet sinon)
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn, checkfirst=True)
+                logger.info("Index créé : %s", index.name)
+
+
+def _seed_derived_tables(conn, created):
+    # Tables maintenues au fil des écritures : créées sur une base existante, elles partiraient
+    # de zéro. Reconstruites dans la même transaction, sous le verrou du DDL.
+    from app import checklist_state, rollups
+    rebuilds = {"dashboard_rollups": rollups.reconstruire,
+                "checklist_current_state": checklist_state.reconstruire}
+    db = Session(bind=conn)  # rejoint la transaction de bootstrap, sans la valider
+    try:
+        for table, reconstruire in rebuilds.items():
+            if table in created:
+                logger.info("Table %s remplie depuis l'historique (%s lignes)", table, reconstruire(db))
+    finally:
+        db.close()
+
+
+def bootstrap(engine) -> bool:
+    """Applique le schéma des modèles si son empreinte a changé ; True si du DDL a été exécuté.
+
+    Démarrage courant : une seule requête (lecture de l'empreinte), aucune inspection.
+    """
+    if current_version(engine) == SCHEMA_VERSION:
+        return False
+
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        existing = set(inspect(conn).get_table_names())
+        Base.metadata.create_all(bind=conn)
+        if conn.execute(select(SchemaVersion.version)).scalar() == SCHEMA_VERSION:
+            return False  # appliqué entre-temps par un autre worker
+        _add_missing_columns(conn)
+        _add_missing_indexes(conn)
+        if existing:
+            _seed_derived_tables(conn, set(Base.metadata.tables) - existing)
+        conn.execute(delete(SchemaVersion))
+        conn.execute(insert(SchemaVersion).values(version=SCHEMA_VERSION, date_applied=datetime.utcnow()))
+    logger.info("Schéma appliqué (version %s)", SCHEMA_VERSION[:12])
+    return True
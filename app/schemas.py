@@ -1,7 +1,7 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, date
 from typing import Dict, List
 
 # 🔹 ENUMS
@@ -29,7 +29,17 @@ class UserCreate(UserBase):
 class UserRead(UserBase):
     id: str
     class Config:
-        orm_mode = True
+        from_attributes = True
+
+class CurrentUser(BaseModel):
+    # Utilisateur authentifié, mis en cache et partagé entre requêtes : immuable, sans lien avec une session
+    id: str
+    role: UserRole
+    name: Optional[str] = None   # absents quand require_manager se fie au seul rôle du token
+    email: Optional[str] = None
+    class Config:
+        from_attributes = True
+        frozen = True
 
 
 # 🔹 CAPTEUR
@@ -49,7 +59,34 @@ class SensorRead(SensorBase):
     date_creation: datetime
 
     class Config:
-        orm_mode = True
+        from_attributes = True
+
+class SensorImportError(BaseModel):
+    line: int  # numéro de ligne dans le fichier (en-tête = 1)
+    reference: Optional[str] = None
+    errors: List[str]
+
+class SensorImportSummary(BaseModel):
+    total: int
+    inserted: int
+    duplicates: int
+    nb_errors: int
+    errors: List[SensorImportError]  # tronqué à IMPORT_MAX_ERRORS, nb_errors reste exact
+    aborted: Optional[str] = None  # lecture interrompue (fichier corrompu)
+
+class SensorPartialRead(BaseModel):
+    # Projection : seuls les champs demandés via ?fields= sont renvoyés
+    id: Optional[str] = None
+    reference: Optional[str] = None
+    type: Optional[str] = None
+    subtype: Optional[str] = None
+    status: Optional[SensorStatus] = None
+    chantier: Optional[str] = None
+    date_creation: Optional[datetime] = None
+
+class SensorPage(BaseModel):
+    items: List[SensorPartialRead]
+    next_cursor: Optional[str] = None  # à renvoyer dans ?cursor= pour la page suivante
 
 
 # 🔹 CHECKLIST & ITEMS
@@ -64,7 +101,7 @@ class ChecklistItemCreate(ChecklistItemBase):
 class ChecklistItemRead(ChecklistItemBase):
     id: str
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 class ChecklistBase(BaseModel):
     type: str
@@ -77,7 +114,7 @@ class ChecklistRead(ChecklistBase):
     id: str
     items: List[ChecklistItemRead]
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 
 # 🔹 REPONSES DE CHECKLIST
@@ -95,7 +132,7 @@ class ChecklistResponseRead(ChecklistResponseBase):
     date_checked: datetime
     user: UserRead
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 
 # 🔹 MOUVEMENT CAPTEUR
@@ -113,7 +150,7 @@ class SensorMovementCreate(SensorMovementBase):
 class SensorMovementRead(SensorMovementBase):
     id: str
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 class SensorReturnRequest(BaseModel):
     sensor_id: str
@@ -129,14 +166,19 @@ class SensorReturnResponse(BaseModel):
     before_maintenance: List[ChecklistItemReadSeparated]
     after_maintenance: List[ChecklistItemReadSeparated]
 
-class ChecklistResponseCreate(BaseModel):
+class SensorReturnBatchRequest(BaseModel):
+    returns: List[SensorReturnRequest]
+
+class SensorReturnBatchItem(BaseModel):
     sensor_id: str
-    item_id: str
-    user_id: str
-    is_checked: bool
+    ok: bool
+    checklist: Optional[SensorReturnResponse] = None
+    error: Optional[str] = None
 
-class ChecklistResponseBatch(BaseModel):
-    responses: List[ChecklistResponseCreate]
+class SensorReturnBatchResponse(BaseModel):
+    nb_ok: int
+    nb_errors: int
+    results: List[SensorReturnBatchItem]  # dans l'ordre des retours envoyés
 
 class ChecklistResponseCreate(BaseModel):
     sensor_id: str
@@ -145,6 +187,10 @@ class ChecklistResponseCreate(BaseModel):
     is_checked: bool
     is_before: bool  # 🔹 Indique si c’est avant ou après maintenance
 
+class ChecklistResponseBatch(BaseModel):
+    responses: List[ChecklistResponseCreate]
+    idempotency_key: Optional[str] = None  # 🔹 Rejouer le même lot ne crée pas de doublons
+
 class ChecklistResponseRead(BaseModel):
     id: str
     sensor_id: str
@@ -155,7 +201,7 @@ class ChecklistResponseRead(BaseModel):
     date_checked: datetime
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 
 class UserRole(str, Enum):
@@ -176,7 +222,7 @@ class UserCreate(BaseModel):
 class UserRead(UserBase):
     id: str
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 class SensorHistoryMovement(BaseModel):
     chantier: str
@@ -185,7 +231,7 @@ class SensorHistoryMovement(BaseModel):
     commentaire: Optional[str]
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 class ChecklistResponseItem(BaseModel):
     item_id: str
@@ -196,11 +242,29 @@ class ChecklistResponseItem(BaseModel):
     date_checked: datetime
 
     class Config:
-        orm_mode = True
+        from_attributes = True
+
+class SensorHistoryBatchRequest(BaseModel):
+    sensor_ids: Optional[List[str]] = None
+    chantier: Optional[str] = None  # sans sensor_ids : tous les capteurs du chantier
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
 
 class SensorHistoryResponse(BaseModel):
     sensor_id: str
     type: str
     subtype: str
     mouvements: List[SensorHistoryMovement]
-    checklist_responses: Dict[str, List[ChecklistResponseItem]]  # {"avant": [], "apres": []}
\ No newline at end of file
+    checklist_responses: Dict[str, List[ChecklistResponseItem]]  # {"avant": [], "apres": []}
+
+class ChecklistStateItem(BaseModel):
+    item_id: str
+    label: str
+    is_checked: bool
+    user_id: Optional[str]
+    date_checked: datetime
+
+class ChecklistStateResponse(BaseModel):
+    sensor_id: str
+    avant: List[ChecklistStateItem]  # dernière réponse connue de chaque point
+    apres: List[ChecklistStateItem]
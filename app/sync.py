@@ -0,0 +1,80 @@
+import os
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app import models
+
+load_dotenv()
+
+# 🔄 Synchronisation incrémentale : les écritures de crud sont journalisées dans change_log
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "500"))
+SYNC_MAX_PAGE_SIZE = int(os.getenv("SYNC_MAX_PAGE_SIZE", "5000"))
+# PostgreSQL : un identifiant peut être commité après un plus grand ; on n'expose que les
+# lignes assez anciennes pour qu'aucune transaction plus ancienne ne soit encore ouverte.
+SYNC_VISIBILITY_DELAY = float(os.getenv("SYNC_VISIBILITY_DELAY", "2"))
+
+# Colonnes renvoyées par entité journalisée
+ENTITIES = {
+    "sensors": (models.Sensor, ("id", "reference", "type", "subtype", "status", "chantier", "date_creation")),
+    "checklists": (models.Checklist, ("id", "type", "subtype")),
+    "checklist_items": (models.ChecklistItem, ("id", "checklist_id", "label", "is_before")),
+    "sensor_movements": (models.SensorMovement,
+                         ("id", "sensor_id", "chantier", "date_depart", "date_retour", "commentaire")),
+}
+
+
+def record(db: Session, entity: str, ids, op: str = "insert"):
+    """Journalise des écritures dans la transaction en cours (sans commit).
+
+    À appeler en dernier, juste avant le commit : l'identifiant et date_changed sont attribués
+    ici, et une attente de verrou entre les deux retarderait d'autant la visibilité de l'entrée.
+    """
+    now = datetime.utcnow()
+    rows = [{"entity": entity, "entity_id": i, "op": op, "date_changed": now} for i in ids]
+    if rows:
+        db.execute(insert(models.ChangeLog), rows)
+
+
+def decode_cursor(since) -> int:
+    try:
+        return int(since or 0)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+
+def get_changes(db: Session, since: int = 0, limit: int = SYNC_PAGE_SIZE):
+    log = models.ChangeLog
+    query = select(log.id, log.entity, log.entity_id, log.op).where(log.id > since)
+    if db.get_bind().dialect.name == "postgresql" and SYNC_VISIBILITY_DELAY:
+        query = query.where(log.date_changed <= datetime.utcnow() - timedelta(seconds=SYNC_VISIBILITY_DELAY))
+    entries = db.execute(query.order_by(log.id).limit(limit + 1)).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # Compactage : une seule entrée par ligne modifiée (la plus récente de la page)
+    latest = {}
+    for entry in entries:
+        latest.pop((entry.entity, entry.entity_id), None)
+        latest[(entry.entity, entry.entity_id)] = entry
+
+    # État courant des lignes : une requête IN par entité
+    data = {}
+    for entity, (model, columns) in ENTITIES.items():
+        ids = [entity_id for (e, entity_id) in latest if e == entity]
+        for i in range(0, len(ids), 500):
+            rows = db.execute(
+                select(*[getattr(model, c) for c in columns]).where(model.id.in_(ids[i:i + 500]))
+            ).all()
+            data.update({(entity, row.id): row._asdict() for row in rows})
+
+    changes = [
+        {"seq": entry.id, "entity": entry.entity, "op": entry.op, "data": data[(entry.entity, entry.entity_id)]}
+        for entry in latest.values() if (entry.entity, entry.entity_id) in data
+    ]
+    return {
+        "changes": changes,
+        "next_cursor": str(entries[-1].id if entries else since),
+        "has_more": has_more,
+    }
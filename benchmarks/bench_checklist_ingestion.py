@@ -0,0 +1,83 @@
+"""Débit d'ingestion des réponses de checklist : boucle ORM historique vs insertion ensembliste.
+
+    python -m benchmarks.bench_checklist_ingestion [taille_lot ...]
+
+Base utilisée : BENCH_DATABASE_URL (SQLite temporaire par défaut).
+"""
+import os
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+from app import crud, models, schemas  # noqa: E402
+
+
+def legacy_create_checklist_responses(db, data):
+    # Implémentation d'origine : un objet ORM et un db.add par réponse
+    for item in data.responses:
+        db.add(models.ChecklistResponse(
+            sensor_id=item.sensor_id,
+            item_id=item.item_id,
+            user_id=item.user_id,
+            is_checked=item.is_checked,
+            is_before=item.is_before
+        ))
+    db.commit()
+
+
+def seed(db):
+    users = [models.User(name=f"Tech {i}", email=f"tech{i}@bench.fr", hashed_password="x", role="technician")
+             for i in range(20)]
+    sensors = [models.Sensor(reference=f"BENCH-{i}", type="T", subtype="S") for i in range(200)]
+    checklist = models.Checklist(type="T", subtype="S")
+    db.add_all(users + sensors + [checklist])
+    db.flush()
+    items = [models.ChecklistItem(checklist_id=checklist.id, label=f"Point {i}", is_before=i % 2 == 0)
+             for i in range(12)]
+    db.add_all(items)
+    db.commit()
+    return [u.id for u in users], [s.id for s in sensors], [(i.id, i.is_before) for i in items]
+
+
+def make_batch(size, users, sensors, items):
+    return schemas.ChecklistResponseBatch(responses=[
+        schemas.ChecklistResponseCreate(
+            sensor_id=sensors[k % len(sensors)],
+            item_id=items[k % len(items)][0],
+            user_id=users[k % len(users)],
+            is_checked=k % 3 != 0,
+            is_before=items[k % len(items)][1],
+        )
+        for k in range(size)
+    ])
+
+
+def run(sizes):
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    engine = create_engine(url)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    with Session() as db:
+        users, sensors, items = seed(db)
+
+    print(f"{'lot':>8} | {'ORM (lignes/s)':>15} | {'ensembliste (lignes/s)':>22} | gain")
+    for size in sizes:
+        batch = make_batch(size, users, sensors, items)
+        results = []
+        for fn in (legacy_create_checklist_responses, crud.create_checklist_responses):
+            with Session() as db:
+                start = time.perf_counter()
+                fn(db, batch)
+                results.append(size / (time.perf_counter() - start))
+        print(f"{size:>8} | {results[0]:>15,.0f} | {results[1]:>22,.0f} | x{results[1] / results[0]:.1f}")
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or [100, 1000, 10000])
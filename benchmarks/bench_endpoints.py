@@ -0,0 +1,215 @@
+"""Latence et débit de chaque route de l'API, à plusieurs volumes de données.
+
+    python -m benchmarks.bench_endpoints
+    python -m benchmarks.bench_endpoints --scales small,medium --compare benchmarks/results/<fichier>.json
+
+Chaque volume tourne dans un sous-processus avec sa propre base SQLite (peuplée par
+benchmarks.seed) ; les routes sont appelées en mémoire via ASGI (httpx), sans réseau.
+Affiche p50 / p99 / req/s par route et enregistre les résultats en JSON dans
+benchmarks/results/ ; --compare affiche l'écart avec un run précédent.
+Les caches de réponses sont désactivés par défaut (BENCH_CACHE=1 pour les garder).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+SCALES = {
+    "small": {"users": 20, "sensors": 100},
+    "medium": {"users": 50, "sensors": 1000},
+    "large": {"users": 200, "sensors": 10000},
+}
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "100"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "4"))
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def _percentile(sorted_values, p):
+    return sorted_values[max(0, int(round(len(sorted_values) * p)) - 1)]
+
+
+# 🔹 Exécuté dans le sous-processus : la base est figée à l'import de app.database
+def run_scale(scale: str) -> dict:
+    import httpx
+    from sqlalchemy import select
+    from benchmarks import seed
+    from app.database import engine, SessionLocal
+    from app.main import app
+    from app import models
+
+    start = time.perf_counter()
+    counts = seed.generate(engine, **SCALES[scale])
+    seed_seconds = time.perf_counter() - start
+
+    db = SessionLocal()
+    try:
+        sensors = db.execute(select(models.Sensor.id, models.Sensor.type, models.Sensor.subtype)).all()
+        chantier = db.execute(
+            select(models.SensorMovement.chantier).where(models.SensorMovement.date_retour.is_(None)).limit(1)
+        ).scalar() or "Chantier 000"
+        on_site = db.execute(
+            select(models.Sensor.id).where(models.Sensor.chantier == chantier)
+        ).scalars().all()
+        user_id = db.execute(select(models.User.id).where(models.User.email == "user1@gmao-bench.fr")).scalar()
+        items = {
+            (c.type, c.subtype): [(i.id, i.is_before) for i in c.items]
+            for c in db.query(models.Checklist).all()
+        }
+    finally:
+        db.close()
+
+    ids = [s.id for s in sensors]
+    state = {"token": None, "job": None}
+
+    def sensor(i):
+        return sensors[(i * 7919) % len(sensors)]
+
+    def responses(i):
+        s = sensor(i)
+        return {"responses": [
+            {"sensor_id": s.id, "item_id": item_id, "user_id": user_id, "is_checked": True, "is_before": before}
+            for item_id, before in items[(s.type, s.subtype)]
+        ]}
+
+    # (nom, méthode, fonction i -> kwargs httpx) ; l'URL est la première clé
+    scenarios = [
+        ("GET /", "GET", lambda i: {"url": "/"}),
+        ("POST /users/login", "POST", lambda i: {
+            "url": "/users/login", "data": {"username": "user1@gmao-bench.fr", "password": seed.SEED_PASSWORD}}),
+        ("GET /users/me", "GET", lambda i: {
+            "url": "/users/me", "headers": {"Authorization": f"Bearer {state['token']}"}}),
+        ("POST /users/register", "POST", lambda i: {"url": "/users/register", "json": {
+            "name": f"Bench {i}", "email": f"bench{i}@gmao-bench.fr", "password": "x",
+            "registration_key": os.getenv("TECHNICIAN_KEY", "")}}),
+        ("GET /sensors/", "GET", lambda i: {"url": "/sensors/", "params": {"limit": 100}}),
+        ("GET /sensors/ (filtres)", "GET", lambda i: {
+            "url": "/sensors/", "params": {"limit": 100, "type": sensor(i).type, "fields": "id,reference,status"}}),
+        ("POST /sensors/", "POST", lambda i: {"url": "/sensors/", "json": {
+            "reference": f"BENCH-{i}-{time.monotonic_ns()}", "type": "inclinometre", "subtype": "vertical"}}),
+        ("GET /sensors/{id}/history", "GET", lambda i: {"url": f"/sensors/{sensor(i).id}/history"}),
+        ("POST /sensors/history/batch", "POST", lambda i: {
+            "url": "/sensors/history/batch", "json": {"sensor_ids": on_site[:200] or ids[:50]}}),
+        ("GET /sensors/{id}/history/export (excel)", "GET", lambda i: {
+            "url": f"/sensors/{sensor(i).id}/history/export"}),
+        ("GET /sensors/{id}/history/export (pdf)", "GET", lambda i: {
+            "url": f"/sensors/{sensor(i).id}/history/export", "params": {"format": "pdf"}}),
+        ("POST /sensors/{id}/history/export-jobs", "POST", lambda i: {
+            "url": f"/sensors/{ids[0]}/history/export-jobs"}),
+        ("GET /sensors/{id}/history/export-jobs/{job}", "GET", lambda i: {
+            "url": f"/sensors/{ids[0]}/history/export-jobs/{state['job']}"}),
+        ("POST /sensors/sensor-return", "POST", lambda i: {
+            "url": "/sensors/sensor-return", "json": {"sensor_id": sensor(i).id, "chantier": "Bench"}}),
+        ("POST /sensors/sensor-return/batch", "POST", lambda i: {"url": "/sensors/sensor-return/batch", "json": {
+            "returns": [{"sensor_id": sensor(i * 50 + k).id, "chantier": "Bench"} for k in range(50)]}}),
+        ("POST /checklists/responses", "POST", lambda i: {"url": "/checklists/responses", "json": responses(i)}),
+        ("POST /checklists/", "POST", lambda i: {"url": "/checklists/", "json": {
+            "type": f"bench {i}", "subtype": "s", "items": [{"label": "Point", "is_before": True}]}}),
+        ("GET /dashboard/", "GET", lambda i: {"url": "/dashboard/"}),
+        ("GET /monitoring/cache", "GET", lambda i: {"url": "/monitoring/cache"}),
+        ("GET /monitoring/pool", "GET", lambda i: {"url": "/monitoring/pool"}),
+        ("GET /metrics", "GET", lambda i: {"url": "/metrics"}),
+    ]
+
+    async def bench():
+        results = {}
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with app.router.lifespan_context(app), \
+                httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            login = await client.post("/users/login", data={"username": "user1@gmao-bench.fr",
+                                                              "password": seed.SEED_PASSWORD})
+            state["token"] = login.json()["access_token"]
+            job = await client.post(f"/sensors/{ids[0]}/history/export-jobs")
+            state["job"] = job.json()["job_id"]
+
+            for name, method, build in scenarios:
+                semaphore = asyncio.Semaphore(CONCURRENCY)
+                latencies, errors = [], 0
+
+                async def one(i):
+                    nonlocal errors
+                    kwargs = build(i)
+                    async with semaphore:
+                        t0 = time.perf_counter()
+                        r = await client.request(method, kwargs.pop("url"), **kwargs)
+                        latencies.append(time.perf_counter() - t0)
+                        errors += r.status_code >= 400
+
+                t0 = time.perf_counter()
+                await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+                elapsed = time.perf_counter() - t0
+                latencies.sort()
+                results[name] = {
+                    "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+                    "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+                    "rps": round(REQUESTS / elapsed, 1),
+                    "errors": errors,
+                }
+        return results
+
+    return {"rows": counts, "seed_seconds": round(seed_seconds, 2), "routes": asyncio.run(bench())}
+
+
+# 🔹 Processus parent : un sous-processus par volume, tableau et sauvegarde
+def _print_scale(scale, data, previous=None):
+    print(f"\n▶ {scale} : {data['rows']} (génération {data['seed_seconds']} s)")
+    print(f"{'route':<46} | {'p50 ms':>8} | {'p99 ms':>8} | {'req/s':>8} | err" + (" | Δ p50" if previous else ""))
+    for name, r in data["routes"].items():
+        line = f"{name:<46} | {r['p50_ms']:>8} | {r['p99_ms']:>8} | {r['rps']:>8} | {r['errors']:>3}"
+        old = (previous or {}).get("routes", {}).get(name)
+        if old and old["p50_ms"]:
+            line += f" | {(r['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100:+.0f} %"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default=",".join(SCALES), help=f"volumes parmi {', '.join(SCALES)}")
+    parser.add_argument("--compare", help="fichier de résultats d'un run précédent")
+    parser.add_argument("--output", help="fichier de sortie (défaut : benchmarks/results/<horodatage>.json)")
+    parser.add_argument("--scale-run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scale_run:
+        print(json.dumps(run_scale(args.scale_run)))
+        return
+
+    previous = json.loads(Path(args.compare).read_text())["scales"] if args.compare else {}
+    report = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "requests": REQUESTS,
+        "concurrency": CONCURRENCY,
+        "scales": {},
+    }
+    for scale in args.scales.split(","):
+        workdir = tempfile.mkdtemp()
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{workdir}/bench.db",
+            "EXPORT_RESULTS_DIR": f"{workdir}/exports",
+            "BCRYPT_ROUNDS": "4",
+        }
+        if os.getenv("BENCH_CACHE", "0") != "1":
+            env.update(CACHE_TTL_DASHBOARD="0", CACHE_TTL_SENSORS="0")
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_endpoints", "--scale-run", scale],
+            env=env, check=True, stdout=subprocess.PIPE, text=True,
+        ).stdout
+        report["scales"][scale] = json.loads(out.strip().splitlines()[-1])
+        _print_scale(scale, report["scales"][scale], previous.get(scale))
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\nRésultats enregistrés dans {output}")
+
+
+if __name__ == "__main__":
+    main()
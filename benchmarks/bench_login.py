@@ -0,0 +1,93 @@
+"""Débit de /users/login sous concurrence (rafale de connexions en début de poste).
+
+    python -m benchmarks.bench_login [concurrence ...]
+
+Mesure le débit, les latences p50/p99, le nombre de 503 (délestage) et la
+latence de GET / pendant la rafale. Réglages : BCRYPT_ROUNDS, HASH_WORKERS,
+HASH_MAX_QUEUE, BENCH_LOGINS (connexions par palier, 200 par défaut).
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx  # noqa: E402
+from app.main import app  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app import auth, models  # noqa: E402
+
+LOGINS = int(os.getenv("BENCH_LOGINS", "200"))
+PASSWORD = "motdepasse-bench"
+
+
+def seed():
+    db = SessionLocal()
+    try:
+        if not db.query(models.User).filter_by(email="bench@gmao.fr").first():
+            db.add(models.User(
+                name="Bench", email="bench@gmao.fr", role="technician",
+                hashed_password=auth.get_password_hash(PASSWORD)
+            ))
+            db.commit()
+    finally:
+        db.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+async def burst(client, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, shed = [], 0
+    done = asyncio.Event()
+
+    async def one_login():
+        nonlocal shed
+        async with semaphore:
+            start = time.perf_counter()
+            r = await client.post("/users/login", data={"username": "bench@gmao.fr", "password": PASSWORD})
+            latencies.append(time.perf_counter() - start)
+            if r.status_code == 503:
+                shed += 1
+
+    async def probe():
+        # Latence d'un endpoint léger pendant la rafale
+        samples = []
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/")
+            samples.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+        return samples
+
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(one_login() for _ in range(LOGINS)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    probe_samples = await probe_task
+    return LOGINS / elapsed, latencies, shed, probe_samples
+
+
+async def main(levels):
+    seed()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"bcrypt rounds={auth.BCRYPT_ROUNDS} workers={auth.HASH_WORKERS} file={auth.HASH_MAX_QUEUE}")
+        print(f"{'concurrence':>11} | {'logins/s':>8} | {'p50 ms':>7} | {'p99 ms':>7} | {'503':>4} | GET / p99 ms")
+        for concurrency in levels:
+            rate, latencies, shed, probe = await burst(client, concurrency)
+            print(
+                f"{concurrency:>11} | {rate:>8.1f} | {statistics.median(latencies) * 1000:>7.1f} | "
+                f"{percentile(latencies, 99) * 1000:>7.1f} | {shed:>4} | {percentile(probe, 99) * 1000:.1f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(a) for a in sys.argv[1:]] or [1, 8, 32, 128]))
@@ -0,0 +1,91 @@
+"""Effet des réglages du pool de connexions sur le débit de l'API.
+
+    python -m benchmarks.bench_pool
+
+Pour chaque combinaison (pool_size, max_overflow, pre_ping), lance BENCH_REQUESTS
+appels concurrents à GET /sensors/{id}/history (non mis en cache) et affiche le
+débit, la latence p99 et les statistiques du pool (attente, débordement, timeouts).
+Base : BENCH_DATABASE_URL (SQLite temporaire par défaut ; PostgreSQL recommandé).
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx  # noqa: E402
+from app.main import app  # noqa: E402
+from app import database, models  # noqa: E402
+
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "500"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "40"))
+SETTINGS = [
+    {"pool_size": 1, "max_overflow": 0, "pool_pre_ping": False},
+    {"pool_size": 5, "max_overflow": 0, "pool_pre_ping": False},
+    {"pool_size": 5, "max_overflow": 10, "pool_pre_ping": False},
+    {"pool_size": 5, "max_overflow": 10, "pool_pre_ping": True},
+    {"pool_size": 20, "max_overflow": 20, "pool_pre_ping": False},
+]
+
+
+def seed():
+    db = database.SessionLocal()
+    try:
+        sensors = [models.Sensor(reference=f"POOL-{i}", type="T", subtype="S") for i in range(20)]
+        db.add_all(sensors)
+        db.flush()
+        db.add_all(
+            models.SensorMovement(sensor_id=s.id, chantier=f"Chantier {k}")
+            for s in sensors for k in range(10)
+        )
+        db.commit()
+        return [s.id for s in sensors]
+    finally:
+        db.close()
+
+
+async def run_setting(sensor_ids, setting):
+    engine = database.create_app_engine(os.environ["DATABASE_URL"], pool_timeout=10, **setting)
+    database.SessionLocal.configure(bind=engine)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies, errors = [], 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    r = await client.get(f"/sensors/{sensor_ids[i % len(sensor_ids)]}/history")
+                    errors += r.status_code != 200
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+        elapsed = time.perf_counter() - start
+
+    stats = database.pool_stats(engine)
+    engine.dispose()
+    latencies.sort()
+    return REQUESTS / elapsed, latencies[int(len(latencies) * 0.99) - 1], errors, stats
+
+
+async def main():
+    sensor_ids = seed()
+    print(f"{REQUESTS} requêtes, concurrence {CONCURRENCY}, base {database.engine.url.get_backend_name()}")
+    print(f"{'size':>4} {'overflow':>8} {'ping':>5} | {'req/s':>7} | {'p99 ms':>7} | {'err':>3} | "
+          f"{'attente moy ms':>14} | {'attente max ms':>14} | {'débord. max':>11} | timeouts")
+    for setting in SETTINGS:
+        rate, p99, errors, stats = await run_setting(sensor_ids, setting)
+        print(
+            f"{setting['pool_size']:>4} {setting['max_overflow']:>8} {str(setting['pool_pre_ping']):>5} | "
+            f"{rate:>7.1f} | {p99 * 1000:>7.1f} | {errors:>3} | {stats['wait_avg_ms']:>14} | "
+            f"{stats['wait_max_ms']:>14} | {stats['overflow_max']:>11} | {stats['timeouts']}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""Temps jusqu'à la première requête d'un worker à froid.
+
+    python -m benchmarks.bench_startup
+
+Lance BENCH_RUNS processus Python neufs, chacun important app.main, exécutant le
+lifespan puis servant GET / et GET /sensors/ via ASGI. Mesure chaque phase, sur
+une base vide (premier démarrage : DDL) puis sur une base déjà à jour (empreinte
+de schéma identique : aucun DDL). Affiche aussi le coût de l'ancien
+Base.metadata.create_all sur la même base et vérifie que les bibliothèques
+d'export (openpyxl, reportlab) ne sont pas chargées au démarrage.
+Base : BENCH_DATABASE_URL (SQLite temporaire par défaut ; PostgreSQL recommandé).
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RUNS = int(os.getenv("BENCH_RUNS", "5"))
+
+# Exécuté dans chaque processus neuf ; les temps sont relatifs au lancement de l'interpréteur
+CHILD = """
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+from app.main import app
+t_import = time.perf_counter()
+import httpx
+from app import schema
+from app.database import engine
+from app.models import Base
+
+async def first_requests():
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        t_lifespan = time.perf_counter()
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.get("/")
+            t_first = time.perf_counter()
+            await client.get("/sensors/")
+            return t_lifespan, t_first, time.perf_counter()
+
+t_lifespan, t_first, t_sensors = asyncio.run(first_requests())
+t = time.perf_counter(); schema.bootstrap(engine); bootstrap = time.perf_counter() - t
+t = time.perf_counter(); Base.metadata.create_all(bind=engine); create_all = time.perf_counter() - t
+print(json.dumps({
+    "import app.main": t_import - t0,
+    "lifespan": t_lifespan - t_import,
+    "1re requête": t_first - t_lifespan,
+    "1er GET /sensors/": t_sensors - t_first,
+    "bootstrap (à jour)": bootstrap,
+    "create_all (ancien)": create_all,
+    "libs d'export chargées": any(m in sys.modules for m in ("openpyxl", "reportlab")),
+}))
+"""
+
+
+def run_once(env):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD], env=env, check=True,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout
+    phases = json.loads(out.strip().splitlines()[-1])
+    phases["total (processus)"] = time.perf_counter() - start
+    return phases
+
+
+def report(title, runs):
+    print(f"\n▶ {title} ({len(runs)} run(s))")
+    for phase in runs[0]:
+        values = [r[phase] for r in runs]
+        if isinstance(values[0], bool):
+            print(f"  {phase:<24} {'oui ⚠️' if any(values) else 'non'}")
+        else:
+            print(f"  {phase:<24} {statistics.median(values) * 1000:>8.1f} ms (médiane)")
+
+
+def main():
+    url = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/startup.db")
+    env = {**os.environ, "DATABASE_URL": url}
+    if url.startswith("sqlite"):
+        # Une base vide par run pour le premier démarrage
+        first = [run_once({**env, "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/startup.db"})
+                 for _ in range(RUNS)]
+        report("Premier démarrage (base vide, DDL)", first)
+    run_once(env)  # base à jour pour la suite
+    report("Redémarrage (schéma à jour, DDL ignoré)", [run_once(env) for _ in range(RUNS)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Nombre de requêtes SQL de l'historique capteur, indépendant de sa longueur.
+
+    python -m benchmarks.check_history_queries
+
+Peuple deux capteurs identiques sauf par la taille de leur historique (HISTORY_SMALL
+puis HISTORY_LARGE réponses de checklist, un mouvement pour dix réponses), puis
+compte les requêtes émises (before_cursor_execute) par l'historique (crud et route),
+les exports Excel et PDF et l'historique groupé. Sort en erreur si un chemin émet
+plus de requêtes pour le long historique : chargement paresseux ligne par ligne (N+1).
+Base : BENCH_DATABASE_URL (SQLite temporaire par défaut).
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/history.db")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+from app import crud, models, schema  # noqa: E402
+from app.database import engine, SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+
+HISTORY_SMALL = int(os.getenv("HISTORY_SMALL", "10"))
+HISTORY_LARGE = int(os.getenv("HISTORY_LARGE", "2000"))
+
+
+def seed():
+    models.Base.metadata.drop_all(bind=engine)
+    schema.bootstrap(engine)
+    now = datetime.utcnow()
+    users = [{"id": models.generate_uuid(), "name": f"Tech {i}", "email": f"tech{i}@history.fr",
+              "hashed_password": "x", "role": models.UserRole.technician} for i in range(20)]
+    checklist_id = models.generate_uuid()
+    items = [{"id": models.generate_uuid(), "checklist_id": checklist_id, "label": f"Point {k}",
+              "is_before": k % 2 == 0} for k in range(8)]
+    sensors, movements, responses = [], [], []
+    for size in (HISTORY_SMALL, HISTORY_LARGE):
+        sensor = {"id": models.generate_uuid(), "reference": f"HIST-{size}", "type": "T", "subtype": "S",
+                  "status": models.SensorStatus.available, "chantier": f"Chantier {size}"}
+        sensors.append(sensor)
+        for k in range(max(1, size // 10)):
+            movements.append({"id": models.generate_uuid(), "sensor_id": sensor["id"], "chantier": sensor["chantier"],
+                              "date_depart": now - timedelta(days=k + 2), "date_retour": now - timedelta(days=k)})
+        for k in range(size):
+            item = items[k % len(items)]
+            responses.append({"id": models.generate_uuid(), "sensor_id": sensor["id"], "item_id": item["id"],
+                              "user_id": users[k % len(users)]["id"], "is_checked": k % 3 != 0,
+                              "is_before": item["is_before"], "date_checked": now - timedelta(hours=k)})
+    with engine.begin() as conn:
+        for model, rows in ((models.User, users), (models.Checklist, [{"id": checklist_id, "type": "T",
+                                                                       "subtype": "S"}]),
+                            (models.ChecklistItem, items), (models.Sensor, sensors),
+                            (models.SensorMovement, movements), (models.ChecklistResponse, responses)):
+            conn.execute(insert(model), rows)
+    return sensors
+
+
+def scenarios(client):
+    def history(sensor):
+        db = SessionLocal()
+        try:
+            crud.get_sensor_history(db, sensor["id"])
+        finally:
+            db.close()
+
+    def call(method, url, body=None):
+        def run(sensor):
+            response = client.request(method, url.format(**sensor), json=body and body(sensor))
+            assert response.status_code == 200, f"{url} : HTTP {response.status_code}"
+        return run
+
+    return {
+        "crud.get_sensor_history": history,
+        "GET /sensors/{id}/history": call("GET", "/sensors/{id}/history"),
+        "export Excel": call("GET", "/sensors/{id}/history/export?format=excel"),
+        "export PDF": call("GET", "/sensors/{id}/history/export?format=pdf"),
+        "historique groupé": call("POST", "/sensors/history/batch", lambda s: {"chantier": s["chantier"]}),
+    }
+
+
+def count_statements(run, sensor):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        run(sensor)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return len(statements)
+
+
+def main():
+    small, large = seed()
+    failures = 0
+    with TestClient(app) as client:
+        for name, run in scenarios(client).items():
+            n_small, n_large = count_statements(run, small), count_statements(run, large)
+            ok = n_small == n_large
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {name} : {n_small} requête(s) pour {HISTORY_SMALL} réponses, "
+                  f"{n_large} pour {HISTORY_LARGE}")
+
+    print(f"{failures} chemin(s) dépendant(s) de la taille de l'historique" if failures
+          else "Nombre de requêtes constant sur tous les chemins")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""Régression des plans d'exécution sur les tables chaudes.
+
+    python -m benchmarks.check_query_plans
+
+Peuple une base volumineuse, exécute les chemins chauds de l'API (historique,
+historique groupé par chantier, retour capteur, liste paginée, dashboard, export)
+en capturant le SQL émis, puis passe chaque SELECT dans EXPLAIN. Sort en erreur si
+l'un d'eux parcourt entièrement une table (SCAN, y compris dans l'ordre d'un index,
+ou index AUTOMATIC construit à la volée sur SQLite ; Seq Scan sur PostgreSQL).
+Base : BENCH_DATABASE_URL (SQLite temporaire par défaut). Volume : PLAN_SENSORS.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/plans.db")
+
+from sqlalchemy import event, insert  # noqa: E402
+from app import crud, exports, models, rollups, schemas  # noqa: E402
+from app.database import engine, SessionLocal  # noqa: E402
+from app.routers import dashboard  # noqa: E402
+
+SENSORS = int(os.getenv("PLAN_SENSORS", "5000"))
+HOT_TABLES = ("sensors", "sensor_movements", "checklist_responses", "checklists", "checklist_items",
+              "dashboard_rollups")
+# Agrégats qui, par définition, lisent toutes les lignes de la flotte
+FULL_SCAN_ALLOWED = ("lag(",)
+# Parcours dans l'ordre d'un index arrêtés par le LIMIT (pagination par clé)
+ORDERED_SCAN_ALLOWED = ("ix_sensors_date_creation_id",)
+
+
+def seed():
+    random.seed(42)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    users = [{"id": models.generate_uuid(), "name": f"Tech {i}", "email": f"tech{i}@plans.fr",
+              "hashed_password": "x", "role": models.UserRole.technician} for i in range(50)]
+    checklists, items = [], []
+    for t in range(10):
+        for st in range(5):
+            checklist_id = models.generate_uuid()
+            checklists.append({"id": checklist_id, "type": f"T{t}", "subtype": f"S{st}"})
+            items += [{"id": models.generate_uuid(), "checklist_id": checklist_id, "label": f"Point {k}",
+                       "is_before": k % 2 == 0} for k in range(8)]
+    sensors = [{"id": models.generate_uuid(), "reference": f"PLAN-{i}", "type": f"T{i % 10}",
+                "subtype": f"S{i % 5}", "date_creation": now - timedelta(minutes=i),
+                "status": models.SensorStatus.available, "chantier": f"Chantier {i % 100}"}
+               for i in range(SENSORS)]
+    movements, responses = [], []
+    for s in sensors:
+        for k in range(5):
+            movements.append({"id": models.generate_uuid(), "sensor_id": s["id"], "chantier": s["chantier"],
+                              "date_retour": now - timedelta(days=random.randint(0, 1000))})
+        for k in range(20):
+            item = random.choice(items)
+            responses.append({"id": models.generate_uuid(), "sensor_id": s["id"], "item_id": item["id"],
+                              "user_id": random.choice(users)["id"], "is_checked": random.random() < 0.8,
+                              "is_before": item["is_before"],
+                              "date_checked": now - timedelta(days=random.randint(0, 1000))})
+    with engine.begin() as conn:
+        for model, rows in ((models.User, users), (models.Checklist, checklists), (models.ChecklistItem, items),
+                            (models.Sensor, sensors), (models.SensorMovement, movements),
+                            (models.ChecklistResponse, responses)):
+            conn.execute(insert(model), rows)
+        conn.exec_driver_sql("ANALYZE")
+    db = SessionLocal()
+    try:
+        rollups.reconstruire(db)
+    finally:
+        db.close()
+    return sensors
+
+
+def full_scans(statement, parameters):
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            found, stack = [], [plan[0]["Plan"]]
+            while stack:
+                node = stack.pop()
+                if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in HOT_TABLES:
+                    found.append(node["Relation Name"])
+                stack.extend(node.get("Plans", []))
+            return found
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        return [detail for *_, detail in rows
+                if detail.split()[1:2] and detail.split()[1] in HOT_TABLES
+                and ((detail.startswith("SCAN ") and not any(ix in detail for ix in ORDERED_SCAN_ALLOWED))
+                     or "AUTOMATIC" in detail)]
+
+
+def scenarios(sensors):
+    sensor = sensors[len(sensors) // 2]
+    since = (datetime.utcnow() - timedelta(days=90)).date()
+
+    def history(db):
+        crud.get_sensor_history(db, sensor["id"], start_date=since)
+
+    def chantier_history(db):
+        crud.get_sensors_history(db, schemas.SensorHistoryBatchRequest(chantier=sensor["chantier"],
+                                                                      start_date=since))
+
+    def sensor_return(db):
+        crud.process_sensor_return(db, schemas.SensorReturnRequest(sensor_id=sensor["id"], chantier="Plans"))
+
+    def sensor_list(db):
+        page = crud.get_sensors_page(db, limit=50)
+        crud.get_sensors_page(db, limit=50, cursor=page["next_cursor"])
+
+    def dashboard_data(db):
+        dashboard._calculer_dashboard(db)
+
+    def export(db):
+        path = tempfile.mktemp(suffix=".xlsx")
+        exports.write_sensor_history_excel(db, db.get(models.Sensor, sensor["id"]), path)
+        os.remove(path)
+
+    return {"historique": history, "historique chantier": chantier_history, "retour capteur": sensor_return,
+            "liste capteurs": sensor_list, "dashboard": dashboard_data, "export excel": export}
+
+
+def main():
+    sensors = seed()
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")) and not executemany:
+            captured.append((statement, parameters))
+
+    failures = 0
+    for name, run in scenarios(sensors).items():
+        before = failures
+        captured.clear()
+        event.listen(engine, "before_cursor_execute", capture)
+        db = SessionLocal()
+        try:
+            run(db)
+        finally:
+            db.close()
+            event.remove(engine, "before_cursor_execute", capture)
+
+        for statement, parameters in captured:
+            if any(marker in statement.lower() for marker in FULL_SCAN_ALLOWED):
+                continue
+            scans = full_scans(statement, parameters)
+            if scans:
+                failures += 1
+                print(f"❌ {name} : parcours complet {scans}\n   {' '.join(statement.split())[:200]}")
+        print(f"{'✅' if failures == before else '❌'} {name} : {len(captured)} requête(s) analysée(s)")
+
+    print(f"{failures} plan(s) en régression" if failures else "Aucun parcours complet sur les tables chaudes")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Générateur de flotte synthétique (SQLite ou PostgreSQL local).
+
+    python -m benchmarks.seed --url sqlite:///gmao_bench.db --users 50 --sensors 10000
+
+Crée des utilisateurs (techniciens + managers), des checklists par type/sous-type,
+des capteurs, leurs mouvements successifs sur les chantiers et les réponses de
+checklist saisies au retour, puis reconstruit les compteurs du dashboard et l'état courant des checklists.
+Les tables sont vidées au préalable. Mot de passe des utilisateurs : SEED_PASSWORD.
+"""
+import argparse
+import random
+import bcrypt
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app import checklist_state, models, rollups
+
+TYPES = {
+    "inclinometre": ["vertical", "horizontal", "biaxial"],
+    "piezometre": ["corde vibrante", "pneumatique"],
+    "extensometre": ["forage", "surface", "fissurometre"],
+    "capteur de pression": ["terre", "interstitielle"],
+    "station totale": ["robotisee"],
+}
+ITEMS_BEFORE = ["Inspection visuelle", "Câble intact", "Connecteur propre", "Étiquette lisible", "Batterie"]
+ITEMS_AFTER = ["Étalonnage vérifié", "Mesure de contrôle", "Nettoyage", "Emballage", "Fiche de suivi"]
+
+INSERT_CHUNK = 5000
+SEED_PASSWORD = "gmao-bench"  # mot de passe de tous les utilisateurs générés
+# Ordre d'insertion compatible avec les clés étrangères
+TABLE_ORDER = (models.User, models.Checklist, models.ChecklistItem, models.Sensor,
+               models.SensorMovement, models.ChecklistResponse)
+
+
+class _Writer:
+    """Insertions Core par paquets pour garder la mémoire bornée sur les gros volumes."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = {}
+        self.counts = {}
+
+    def add(self, model, row):
+        self.rows.setdefault(model, []).append(row)
+        if len(self.rows[model]) >= INSERT_CHUNK:
+            self.flush()
+
+    def flush(self):
+        # Toutes les tables, parents d'abord : une ligne n'est jamais écrite avant sa référence
+        for m in TABLE_ORDER:
+            if self.rows.get(m):
+                self.conn.execute(insert(m), self.rows[m])
+                self.counts[m.__tablename__] = self.counts.get(m.__tablename__, 0) + len(self.rows[m])
+                self.rows[m] = []
+
+
+def generate(
+    engine,
+    users: int = 20,
+    sensors: int = 1000,
+    movements_per_sensor: float = 6,
+    checklist_ratio: float = 0.8,
+    checked_ratio: float = 0.9,
+    years: float = 3,
+    seed: int = 42,
+):
+    """Peuple la base liée à `engine` ; renvoie le nombre de lignes créées par table."""
+    rng = random.Random(seed)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    password_hash = bcrypt.hashpw(SEED_PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+
+    now = datetime.utcnow()
+    origin = now - timedelta(days=365 * years)
+    chantiers = [f"Chantier {n:03d}" for n in range(max(5, sensors // 20))]
+
+    with engine.begin() as conn:
+        w = _Writer(conn)
+
+        # 👤 Utilisateurs : un manager pour dix techniciens
+        technicians = []
+        for i in range(users):
+            role = models.UserRole.manager if i % 10 == 0 else models.UserRole.technician
+            user_id = models.generate_uuid()
+            w.add(models.User, {"id": user_id, "name": f"Utilisateur {i}", "email": f"user{i}@gmao-bench.fr",
+                                "hashed_password": password_hash, "role": role})
+            if role == models.UserRole.technician:
+                technicians.append(user_id)
+        technicians = technicians or [user_id]
+
+        # 📋 Une checklist par (type, sous-type)
+        templates = {}
+        for type_, subtypes in TYPES.items():
+            for subtype in subtypes:
+                checklist_id = models.generate_uuid()
+                w.add(models.Checklist, {"id": checklist_id, "type": type_, "subtype": subtype})
+                items = []
+                for label, is_before in [(l, True) for l in ITEMS_BEFORE] + [(l, False) for l in ITEMS_AFTER]:
+                    item_id = models.generate_uuid()
+                    w.add(models.ChecklistItem, {"id": item_id, "checklist_id": checklist_id,
+                                                 "label": label, "is_before": is_before})
+                    items.append((item_id, is_before))
+                templates[(type_, subtype)] = items
+
+        # 📡 Capteurs et leur historique de chantiers
+        keys = list(templates)
+        for i in range(sensors):
+            type_, subtype = rng.choice(keys)
+            sensor_id = models.generate_uuid()
+            created = origin + timedelta(days=rng.uniform(0, 90))
+            nb_movements = max(0, int(rng.expovariate(1 / movements_per_sensor))) if movements_per_sensor else 0
+
+            cursor, status, current_chantier = created, models.SensorStatus.available, None
+            movements, responses = [], []
+            for k in range(nb_movements):
+                depart = cursor + timedelta(days=rng.uniform(1, 30))
+                retour = depart + timedelta(days=rng.uniform(7, 120))
+                chantier = rng.choice(chantiers)
+                if retour > now:
+                    # Dernier mouvement encore en cours : capteur loué sur le chantier
+                    movements.append({"id": models.generate_uuid(), "sensor_id": sensor_id,
+                                      "chantier": chantier, "date_depart": depart,
+                                      "date_retour": None, "commentaire": None})
+                    status, current_chantier = models.SensorStatus.rented, chantier
+                    break
+                movements.append({"id": models.generate_uuid(), "sensor_id": sensor_id,
+                                  "chantier": chantier, "date_depart": depart, "date_retour": retour,
+                                  "commentaire": "RAS" if rng.random() < 0.7 else "Câble abîmé"})
+                if rng.random() < checklist_ratio:
+                    user_id = rng.choice(technicians)
+                    for item_id, is_before in templates[(type_, subtype)]:
+                        responses.append({
+                            "id": models.generate_uuid(), "sensor_id": sensor_id, "user_id": user_id,
+                            "item_id": item_id, "is_checked": rng.random() < checked_ratio,
+                            "is_before": is_before,
+                            "date_checked": retour + timedelta(hours=rng.uniform(1, 48)),
+                        })
+                cursor = retour
+
+            w.add(models.Sensor, {"id": sensor_id, "reference": f"CAP-{i:06d}", "type": type_,
+                                  "subtype": subtype, "date_creation": created, "status": status,
+                                  "chantier": current_chantier, "created_by": None})
+            for row in movements:
+                w.add(models.SensorMovement, row)
+            for row in responses:
+                w.add(models.ChecklistResponse, row)
+
+        w.flush()
+        if engine.dialect.name in ("sqlite", "postgresql"):
+            conn.exec_driver_sql("ANALYZE")
+
+    db = sessionmaker(bind=engine)()
+    try:
+        rollups.reconstruire(db)
+        checklist_state.reconstruire(db)
+    finally:
+        db.close()
+    return w.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="sqlite:///gmao_bench.db", help="URL SQLAlchemy de la base à peupler")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--sensors", type=int, default=1000)
+    parser.add_argument("--movements", type=float, default=6, help="mouvements moyens par capteur")
+    parser.add_argument("--checklist-ratio", type=float, default=0.8, help="part des retours avec checklist")
+    parser.add_argument("--checked-ratio", type=float, default=0.9, help="part des cases cochées")
+    parser.add_argument("--years", type=float, default=3, help="profondeur d'historique")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    counts = generate(
+        create_engine(args.url), users=args.users, sensors=args.sensors, movements_per_sensor=args.movements,
+        checklist_ratio=args.checklist_ratio, checked_ratio=args.checked_ratio, years=args.years,
+        seed=args.seed,
+    )
+    for table, n in counts.items():
+        print(f"{table:>22} : {n}")
+
+
+if __name__ == "__main__":
+    main()